@@ -3,34 +3,54 @@ from __future__ import print_function, unicode_literals
 import select
 
 from binascii import hexlify
-from collections import defaultdict
+from collections import defaultdict, deque
+from errno import EAGAIN, EWOULDBLOCK
 from socket import (AF_INET, SOCK_STREAM, SHUT_RDWR, SOL_SOCKET, SO_KEEPALIVE,
-                    IPPROTO_TCP, TCP_NODELAY, socket, error as SocketError)
-from threading import Thread, Event
+                    IPPROTO_TCP, TCP_NODELAY, socket, error as SocketError,
+                    timeout as SocketTimeout)
+from threading import Thread, Event, Lock, current_thread
 from weakref import WeakSet
 
-from .llrp_decoder import TYPE_CUSTOM, VENDOR_ID_IMPINJ
+from .llrp_decoder import (TYPE_CUSTOM, VENDOR_ID_IMPINJ,
+                           msg_header_unpack_from)
 from .llrp_proto import (LLRPROSpec, LLRPError, Message_struct,
-                         msg_header_len, msg_header_pack, msg_header_unpack,
-                         msg_header_encode, msg_header_decode,
-                         get_message_name_from_type, Capability_Name2Type,
+                         msg_header_len, msg_header_encode, msg_header_decode,
+                         Message_Type2Decoder, Message_StdType2Decoder,
+                         Message_Name2Encoder, Capability_Name2Type,
                          AirProtocol, llrp_data2xml, LLRPMessageDict,
+                         VER_PROTO_V1,
                          DEFAULT_CHANNEL_INDEX, DEFAULT_HOPTABLE_INDEX)
 from .llrp_errors import ReaderConfigurationError
 from .log import get_logger, is_general_debug_enabled
-from .util import natural_keys, iteritems, iterkeys, find_closest
+from .util import iteritems, iterkeys, find_closest, monotonic
 
 LLRP_DEFAULT_PORT = 5084
 LLRP_MSG_ID_MAX = 4294967295
 THREAD_NAME_PREFIX = 'sllurp-reader'
+# Size of the reused receive buffer, large tag reports take less reads
+RECV_BUFFER_SIZE = 65536
+
+# Keepalives only require an acknowledgement, there is no need to decode them
+# unless a user callback is interested in them.
+MSG_TYPE_KEEPALIVE = Message_struct['KEEPALIVE']['type']
+# Reports are only consumed by user callbacks, so they can be dropped without
+# being decoded when nobody is listening for them.
+MSG_TYPE_RO_ACCESS_REPORT = Message_struct['RO_ACCESS_REPORT']['type']
+# Once connected, the state machine ignores event notifications too.
+MSG_TYPE_READER_EVENT_NOTIFICATION = \
+    Message_struct['READER_EVENT_NOTIFICATION']['type']
 
 all_reader_refs = WeakSet()
 logger = get_logger(__name__)
 
 
 
+# Marks a cached value that was not computed yet
+_NOT_COMPUTED = object()
+
+
 class LLRPMessage(object):
-    __slots__ = ['msgdict', 'msgbytes', 'msgname']
+    __slots__ = ['msgdict', 'msgbytes', 'msgname', '_success']
 
     def __init__(self, msgdict=None, msgbytes=None):
         if not (msgdict or msgbytes):
@@ -39,8 +59,11 @@ class LLRPMessage(object):
         self.msgdict = None
         self.msgbytes = None
         self.msgname = None
+        self._success = _NOT_COMPUTED
         if msgdict:
             self.msgdict = LLRPMessageDict(msgdict)
+            # A message dict holds a single message: {name: content}
+            self.msgname = next(iterkeys(self.msgdict))
             if not msgbytes:
                 self.serialize()
         if msgbytes:
@@ -48,42 +71,22 @@ class LLRPMessage(object):
             if not msgdict:
                 self.deserialize()
 
+    @classmethod
+    def from_bytes(cls, msgbytes):
+        """Create a message by decoding a sequence of received bytes"""
+        msg = cls.__new__(cls)
+        msg.msgdict = None
+        msg.msgbytes = msgbytes
+        msg.msgname = None
+        msg.deserialize()
+        return msg
+
     def serialize(self):
         """Turns a message dictionary into a sequence of bytes"""
         if self.msgdict is None:
             raise LLRPError('No message dict to serialize.')
-        msgdict_iter = iteritems(self.msgdict)
-        name, msgitem = next(msgdict_iter)
-        logger.debugfast('serializing %s command', name)
-
-        try:
-            msg_info = Message_struct[name]
-        except KeyError:
-            raise LLRPError('Unknown message type: %s. Cannot encode.' % name)
-
-        try:
-            encoder = msg_info['encode']
-        except KeyError:
-            raise LLRPError('Cannot find encoder for message type %s' % name)
-
-        version = msgitem.get('Ver', 1)
-        msgtype = msg_info['type']
-        if name == "CUSTOM_MESSAGE":
-            vendorid = msgitem['VendorID']
-            subtype = msgitem['Subtype']
-        else:
-            vendorid = msg_info.get('vendorid', 0)
-            subtype = msg_info.get('subtype', 0)
-        msgid = msgitem.get('ID', 0)
-        data = encoder(msgitem, msg_info)
-
-        self.msgbytes = msg_header_encode(msgtype, version, len(data), msgid,
-                                          vendorid, subtype)
-        self.msgbytes += data
-        if is_general_debug_enabled():
-            logger.debugfast('serialized bytes: %s', hexlify(self.msgbytes))
-            logger.debugfast('done serializing %s command', name)
-        self.msgname = name
+        self.msgbytes = encode_message(self.msgname,
+                                       self.msgdict[self.msgname])
 
     def deserialize(self):
         """Turns a sequence of bytes into a message dictionary."""
@@ -97,31 +100,33 @@ class LLRPMessage(object):
          hdr_len,
          full_length,
          msgid) = msg_header_decode(data)
-        try:
-            try:
-                name = get_message_name_from_type(msgtype, vendorid, subtype)
-            except KeyError:
-                # If no specific custom_message struct, fallback to generic one
-                if msgtype == TYPE_CUSTOM:
-                    name = "CUSTOM_MESSAGE"
-                    logger.debugfast('Unknown "custom message" will be decoded'
-                                     ' with the generic custom_message decoder'
-                                     ' (%s,%s,%s)', msgtype, vendorid, subtype)
-                else:
-                    raise
-            logger.debugfast('deserializing %s command', name)
-            decoder = Message_struct[name]['decode']
-        except KeyError:
-            raise LLRPError('Cannot find decoder for message type '
-                            '{}'.format(msgtype))
+        if msgtype != TYPE_CUSTOM:
+            entry = None
+            if 0 <= msgtype < len(Message_StdType2Decoder):
+                entry = Message_StdType2Decoder[msgtype]
+            if entry is None:
+                raise LLRPError('Cannot find decoder for message type '
+                                '{}'.format(msgtype))
+            name, decoder = entry
+        elif (msgtype, vendorid, subtype) in Message_Type2Decoder:
+            name, decoder = Message_Type2Decoder[(msgtype, vendorid, subtype)]
+        else:
+            # If no specific custom_message struct, fallback to generic one
+            logger.debugfast('Unknown "custom message" will be decoded'
+                             ' with the generic custom_message decoder'
+                             ' (%s,%s,%s)', msgtype, vendorid, subtype)
+            name, decoder = Message_Type2Decoder[(TYPE_CUSTOM, 0, 0)]
+        logger.debugfast('deserializing %s command', name)
         body = data[hdr_len:full_length]
         try:
-            self.msgdict = {
-                name: dict(decoder(body, name))
-            }
-            self.msgdict[name]['Ver'] = ver
-            self.msgdict[name]['Type'] = msgtype
-            self.msgdict[name]['ID'] = msgid
+            msgitem = decoder(body, name)
+            if type(msgitem) is not dict:
+                msgitem = dict(msgitem)
+            msgitem['Ver'] = ver
+            msgitem['Type'] = msgtype
+            msgitem['ID'] = msgid
+            self.msgdict = {name: msgitem}
+            self._success = _NOT_COMPUTED
             logger.debugfast('done deserializing %s command', name)
         except LLRPError:
             logger.error('Problem with %s message format', name)
@@ -132,6 +137,13 @@ class LLRPMessage(object):
         self.msgname = name
 
     def isSuccess(self):
+        # Asked several times per received message by the state machine
+        success = self._success
+        if success is _NOT_COMPUTED:
+            success = self._success = self._getSuccess()
+        return success
+
+    def _getSuccess(self):
         if not self.msgdict:
             return False
         msgName = self.getName()
@@ -162,6 +174,86 @@ class LLRPMessage(object):
         return ret
 
 
+def encode_message(name, msgitem):
+    """Encode the content of a message to a sequence of bytes"""
+    logger.debugfast('serializing %s command', name)
+
+    try:
+        msg_info, encoder = Message_Name2Encoder[name]
+    except KeyError:
+        if name not in Message_struct:
+            raise LLRPError('Unknown message type: %s. Cannot encode.'
+                            % name)
+        raise LLRPError('Cannot find encoder for message type %s' % name)
+
+    version = msgitem.get('Ver', 1)
+    msgtype = msg_info['type']
+    if name == "CUSTOM_MESSAGE":
+        vendorid = msgitem['VendorID']
+        subtype = msgitem['Subtype']
+    else:
+        vendorid = msg_info.get('vendorid', 0)
+        subtype = msg_info.get('subtype', 0)
+    msgid = msgitem.get('ID', 0)
+    data = encoder(msgitem, msg_info)
+
+    msgbytes = msg_header_encode(msgtype, version, len(data), msgid,
+                                 vendorid, subtype) + data
+    if is_general_debug_enabled():
+        logger.debugfast('serialized bytes: %s', hexlify(msgbytes))
+        logger.debugfast('done serializing %s command', name)
+    return msgbytes
+
+
+def _prebuild_message(name, msgitem):
+    msg_info, encoder = Message_Name2Encoder[name]
+    return (msg_info['type'], msg_info.get('vendorid', 0),
+            msg_info.get('subtype', 0), encoder(msgitem, msg_info))
+
+
+REQUESTED_DATA_ALL = Capability_Name2Type['All']
+
+# Messages with a content that never changes: their body is encoded once and
+# only the header, with a new message ID, has to be packed for each send.
+PREBUILT_MESSAGES = {
+    'KEEPALIVE_ACK': _prebuild_message('KEEPALIVE_ACK', {}),
+    'IMPINJ_ENABLE_EXTENSIONS': _prebuild_message('IMPINJ_ENABLE_EXTENSIONS',
+                                                  {}),
+    'GET_READER_CAPABILITIES': _prebuild_message(
+        'GET_READER_CAPABILITIES',
+        {'RequestedData': REQUESTED_DATA_ALL}),
+    'GET_READER_CONFIG': _prebuild_message(
+        'GET_READER_CONFIG',
+        {'RequestedData': REQUESTED_DATA_ALL}),
+    'ENABLE_EVENTS_AND_REPORTS': _prebuild_message('ENABLE_EVENTS_AND_REPORTS',
+                                                   {}),
+    # all AccessSpecs
+    'DELETE_ACCESSSPEC': _prebuild_message('DELETE_ACCESSSPEC',
+                                           {'AccessSpecID': 0}),
+    # all ROSpecs
+    'DELETE_ROSPEC': _prebuild_message('DELETE_ROSPEC', {'ROSpecID': 0}),
+}
+# GET_READER_CONFIG also asking for the Impinj extended configuration
+PREBUILT_IMPINJ_GET_READER_CONFIG = _prebuild_message(
+    'GET_READER_CONFIG',
+    {'RequestedData': REQUESTED_DATA_ALL,
+     # per Octane LLRP guide:
+     # 2000 = All configuration params
+     'ImpinjRequestedData': {'RequestedData': 2000}})
+
+# Messages with only the ID of a ROSpec or of an AccessSpec as content, and
+# the name of that field. Their 4 bytes body is cheap enough to be encoded
+# for each send, without going through a full message dict.
+SPEC_ID_MESSAGES = {
+    'ENABLE_ROSPEC': 'ROSpecID',
+    'START_ROSPEC': 'ROSpecID',
+    'DISABLE_ROSPEC': 'ROSpecID',
+    'ENABLE_ACCESSSPEC': 'AccessSpecID',
+    'DISABLE_ACCESSSPEC': 'AccessSpecID',
+    'DELETE_ACCESSSPEC': 'AccessSpecID',
+}
+
+
 class C1G2TargetTag(object):
     def __init__(self, MB=0, Pointer=0, MaskBitCount=0, TagMask=b'',
                  DataBitCount=0, TagData=b''):
@@ -303,13 +395,23 @@ class LLRPReaderState(object):
     @classmethod
     def getStateName(cls, state):
         try:
-            return [st_name for st_name, st_num in cls.getStates()
-                    if st_num == state][0]
-        except IndexError:
+            return _STATE_NUM2NAME[state]
+        except KeyError:
             raise LLRPError('unknown state {}'.format(state))
 
 
+# Reverse lookup of the state names, states are fixed
+_STATE_NUM2NAME = dict((st_num, st_name)
+                       for st_name, st_num in LLRPReaderState.getStates())
+
+
 class LLRPClient(object):
+    __slots__ = ['config', 'transport_tx_write', 'state_change_callback',
+                 'state', 'capabilities', 'reader_config', 'reader_mode',
+                 'max_ant', 'peername', 'tx_power_table', 'tx_power_min_idx',
+                 'tx_power_max_idx', 'tx_power_max_dbm', '_state_handlers',
+                 '_deferreds', 'rospec', 'last_msg_id', 'disconnecting']
+
     def __init__(self, config, transport_tx_write=None,
                  state_change_callback=None):
 
@@ -329,6 +431,10 @@ class LLRPClient(object):
         self.peername = None
 
         self.tx_power_table = []
+        # indexes of the min and max values of tx_power_table, and max dBm
+        self.tx_power_min_idx = 0
+        self.tx_power_max_idx = 0
+        self.tx_power_max_dbm = 0
 
         if config.reset_on_connect:
             logger.info('will reset reader state on connect')
@@ -348,6 +454,33 @@ class LLRPClient(object):
         logger.info('transmit power: %s', config.tx_power)
 
 
+        # State machine: STATE_* -> handler of the messages received in it
+        self._state_handlers = {
+            LLRPReaderState.STATE_DISCONNECTED: self._handle_connecting,
+            LLRPReaderState.STATE_CONNECTING: self._handle_connecting,
+            LLRPReaderState.STATE_CONNECTED: self._handle_connecting,
+            LLRPReaderState.STATE_SENT_ENABLE_IMPINJ_EXTENSIONS:
+                self._handle_sent_enable_impinj_extensions,
+            LLRPReaderState.STATE_SENT_GET_CAPABILITIES:
+                self._handle_sent_get_capabilities,
+            LLRPReaderState.STATE_SENT_GET_CONFIG:
+                self._handle_sent_get_config,
+            LLRPReaderState.STATE_SENT_SET_CONFIG:
+                self._handle_sent_set_config,
+            LLRPReaderState.STATE_SENT_ADD_ROSPEC:
+                self._handle_sent_add_rospec,
+            LLRPReaderState.STATE_SENT_ENABLE_ROSPEC:
+                self._handle_sent_enable_rospec,
+            LLRPReaderState.STATE_PAUSING: self._handle_pausing,
+            LLRPReaderState.STATE_SENT_START_ROSPEC:
+                self._handle_sent_start_rospec,
+            LLRPReaderState.STATE_INVENTORYING: self._handle_inventorying,
+            LLRPReaderState.STATE_SENT_DELETE_ACCESSSPEC:
+                self._handle_sent_delete_accessspec,
+            LLRPReaderState.STATE_SENT_DELETE_ROSPEC:
+                self._handle_sent_delete_rospec,
+        }
+
         # Deferreds to fire during state machine machinations
         self._deferreds = defaultdict(list)
 
@@ -415,8 +548,12 @@ class LLRPClient(object):
 
         # parse available transmit power entries, set self.tx_power
         bandcap = capdict['RegulatoryCapabilities']['UHFBandCapabilities']
-        self.tx_power_table = self.parsePowerTable(bandcap)
-        logger.debugfast('tx_power_table: %s', self.tx_power_table)
+        tx_power_table = self.parsePowerTable(bandcap)
+        self.tx_power_table = tx_power_table
+        self.tx_power_max_dbm = max(tx_power_table)
+        self.tx_power_min_idx = tx_power_table.index(min(tx_power_table))
+        self.tx_power_max_idx = tx_power_table.index(self.tx_power_max_dbm)
+        logger.debugfast('tx_power_table: %s', tx_power_table)
         if self.config.tx_power_dbm is not None:
             self.setTxPowerDbm(self.config.tx_power_dbm)
         else:
@@ -432,12 +569,11 @@ class LLRPClient(object):
         if self.config.mode_identifier is not None:
             logger.debugfast('Setting mode from mode_identifier=%s',
                              self.config.mode_identifier)
+            modes_by_id = dict((mo['ModeIdentifier'], mo) for mo in mode_list)
             try:
-                mode = [mo for mo in mode_list
-                        if mo['ModeIdentifier'] == self.config.mode_identifier][0]
-                self.reader_mode = mode
-            except IndexError:
-                valid_modes = sorted(mo['ModeIdentifier'] for mo in mode_list)
+                self.reader_mode = modes_by_id[self.config.mode_identifier]
+            except KeyError:
+                valid_modes = sorted(modes_by_id)
                 errstr = ('Invalid mode_identifier; valid mode_identifiers'
                           ' are {}'.format(valid_modes))
                 raise ReaderConfigurationError(errstr)
@@ -455,7 +591,9 @@ class LLRPClient(object):
         logger.info('using reader mode: %s', self.reader_mode)
 
     def processDeferreds(self, msgName, isSuccess):
-        deferreds = self._deferreds[msgName]
+        # Detach the callbacks first: the ones registered while they run are
+        # waiting for the next message with that name.
+        deferreds = self._deferreds.pop(msgName, None)
         if not deferreds:
             return
         if is_general_debug_enabled():
@@ -463,7 +601,22 @@ class LLRPClient(object):
                              'isSuccess=%s', len(deferreds), msgName, isSuccess)
         for deferred_cb in deferreds:
             deferred_cb(self.state, isSuccess)
-        del self._deferreds[msgName]
+
+    def wants_message(self, msgName):
+        """Tell if handleMessage would make any use of a msgName message.
+
+        When it would not, the transport can drop the message without
+        decoding it (a KEEPALIVE still has to be acknowledged).
+        """
+        if msgName == 'KEEPALIVE':
+            # Only acknowledged
+            return False
+        if msgName == 'RO_ACCESS_REPORT':
+            return self.state == LLRPReaderState.STATE_INVENTORYING and \
+                bool(self._deferreds.get(msgName))
+        if msgName == 'READER_EVENT_NOTIFICATION':
+            return self.state < LLRPReaderState.STATE_CONNECTED
+        return True
 
     def handleMessage(self, lmsg):
         """Implements the LLRP client state machine."""
@@ -489,299 +642,299 @@ class LLRPClient(object):
 
         if is_general_debug_enabled():
             logger.debugfast('in handleMessage(%s), there are %d Deferreds',
-                             msgName, len(self._deferreds[msgName]))
+                             msgName, len(self._deferreds.get(msgName, ())))
 
         #######
         # LLRP client state machine follows.  Beware: gets thorny.  Note the
         # order of the LLRPReaderState.STATE_* fields.
         #######
+        try:
+            handler = self._state_handlers[self.state]
+        except KeyError:
+            logger.warn('message %s received in unknown state!', msgName)
+        else:
+            handler(msgName, lmsg)
+
+        if self._deferreds.get(msgName):
+            logger.error('there should NOT be Deferreds left for %s,'
+                         ' but there are!', msgName)
 
+    def _handle_connecting(self, msgName, lmsg):
         # in DISCONNECTED, CONNECTING, and CONNECTED states, expect only
         # READER_EVENT_NOTIFICATION messages.
-        if self.state in (LLRPReaderState.STATE_DISCONNECTED,
-                          LLRPReaderState.STATE_CONNECTING,
-                          LLRPReaderState.STATE_CONNECTED):
-            if msgName != 'READER_EVENT_NOTIFICATION':
-                logger.error('unexpected message %s while connecting', msgName)
-                return
+        if msgName != 'READER_EVENT_NOTIFICATION':
+            logger.error('unexpected message %s while connecting', msgName)
+            return
 
-            if not lmsg.isSuccess():
-                rend = lmsg.msgdict[msgName]['ReaderEventNotificationData']
-                try:
-                    status = rend['ConnectionAttemptEvent']['Status']
-                except KeyError:
-                    status = '(unknown status)'
-                logger.fatal('Could not start session on reader: %s', status)
-                return
+        if not lmsg.isSuccess():
+            rend = lmsg.msgdict[msgName]['ReaderEventNotificationData']
+            try:
+                status = rend['ConnectionAttemptEvent']['Status']
+            except KeyError:
+                status = '(unknown status)'
+            logger.fatal('Could not start session on reader: %s', status)
+            return
+
+        self.disconnecting = False
 
-            self.disconnecting = False
+        self.processDeferreds(msgName, lmsg.isSuccess())
+
+        # a Deferred to call when we get GET_READER_CAPABILITIES_RESPONSE
+        def get_reader_capabilities_cb(state, is_success, *args):
+            if is_success:
+                self.setState(LLRPReaderState.STATE_CONNECTED)
+            else:
+                self.panic(None, 'GET_READER_CAPABILITIES failed')
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        if self.config.impinj_search_mode \
+           or self.config.impinj_tag_content_selector \
+           or self.config.impinj_extended_configuration \
+           or self.config.impinj_event_selector \
+           or self.config.frequencies.get('Automatic', False) \
+           or len(self.config.frequencies.get('Channelist', [])) > 1:
 
-            # a Deferred to call when we get GET_READER_CAPABILITIES_RESPONSE
-            def get_reader_capabilities_cb(state, is_success, *args):
+            def enable_impinj_ext_cb(state, is_success, *args):
                 if is_success:
-                    self.setState(LLRPReaderState.STATE_CONNECTED)
+                    self.send_GET_READER_CAPABILITIES(
+                        self, onCompletion=get_reader_capabilities_cb)
                 else:
-                    self.panic(None, 'GET_READER_CAPABILITIES failed')
-
-            if self.config.impinj_search_mode \
-               or self.config.impinj_tag_content_selector \
-               or self.config.impinj_extended_configuration \
-               or self.config.impinj_event_selector \
-               or self.config.frequencies.get('Automatic', False) \
-               or len(self.config.frequencies.get('Channelist', [])) > 1:
-
-                def enable_impinj_ext_cb(state, is_success, *args):
-                    if is_success:
-                        self.send_GET_READER_CAPABILITIES(
-                            self, onCompletion=get_reader_capabilities_cb)
-                    else:
-                        self.panic(None, 'ENABLE_IMPINJ_EXTENSIONS failed')
-                        raise ReaderConfigurationError(
-                            "ENABLE_IMPINJ_EXTENSIONS failed")
+                    self.panic(None, 'ENABLE_IMPINJ_EXTENSIONS failed')
+                    raise ReaderConfigurationError(
+                        "ENABLE_IMPINJ_EXTENSIONS failed")
 
-                self.send_ENABLE_IMPINJ_EXTENSIONS(
-                    onCompletion=enable_impinj_ext_cb)
-            else:
-                self.send_GET_READER_CAPABILITIES(
-                    self, onCompletion=get_reader_capabilities_cb)
-
-        elif self.state == LLRPReaderState.STATE_SENT_ENABLE_IMPINJ_EXTENSIONS:
-            if is_general_debug_enabled():
-                logger.debugfast(lmsg)
-            if msgName != 'IMPINJ_ENABLE_EXTENSIONS_RESPONSE':
-                logger.error('unexpected response %s while enabling Impinj'
-                             'extensions', msgName)
-                raise ReaderConfigurationError(
-                    "Unexpected response while enabling Impinj extensions")
-
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s enabling Impinj extensions: %s',
-                             status, err)
-                raise ReaderConfigurationError(
-                    "ENABLE_IMPINJ_EXTENSIONS failed")
-            logger.debugfast('Successfully enabled Impinj extensions')
-
-            self.processDeferreds(msgName, lmsg.isSuccess())
+            self.send_ENABLE_IMPINJ_EXTENSIONS(
+                onCompletion=enable_impinj_ext_cb)
+        else:
+            self.send_GET_READER_CAPABILITIES(
+                self, onCompletion=get_reader_capabilities_cb)
 
+    def _handle_sent_enable_impinj_extensions(self, msgName, lmsg):
+        if is_general_debug_enabled():
+            logger.debugfast(lmsg)
+        if msgName != 'IMPINJ_ENABLE_EXTENSIONS_RESPONSE':
+            logger.error('unexpected response %s while enabling Impinj'
+                         'extensions', msgName)
+            raise ReaderConfigurationError(
+                "Unexpected response while enabling Impinj extensions")
+
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s enabling Impinj extensions: %s',
+                         status, err)
+            raise ReaderConfigurationError(
+                "ENABLE_IMPINJ_EXTENSIONS failed")
+        logger.debugfast('Successfully enabled Impinj extensions')
+
+        self.processDeferreds(msgName, lmsg.isSuccess())
+
+    def _handle_sent_get_capabilities(self, msgName, lmsg):
         # in state SENT_GET_CAPABILITIES, expect GET_CAPABILITIES_RESPONSE;
         # respond to this message by advancing to state CONNECTED.
-        elif self.state == LLRPReaderState.STATE_SENT_GET_CAPABILITIES:
-            if msgName != 'GET_READER_CAPABILITIES_RESPONSE':
-                logger.error('unexpected response %s getting capabilities',
-                             msgName)
-                raise ReaderConfigurationError(
-                    "Unexpected response while getting capabilities")
-
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s getting capabilities: %s', status, err)
-                raise ReaderConfigurationError(
-                    "Error getting capabilities")
-
-            self.capabilities = \
-                lmsg.msgdict['GET_READER_CAPABILITIES_RESPONSE']
+        if msgName != 'GET_READER_CAPABILITIES_RESPONSE':
+            logger.error('unexpected response %s getting capabilities',
+                         msgName)
+            raise ReaderConfigurationError(
+                "Unexpected response while getting capabilities")
+
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s getting capabilities: %s', status, err)
+            raise ReaderConfigurationError(
+                "Error getting capabilities")
+
+        self.capabilities = \
+            lmsg.msgdict['GET_READER_CAPABILITIES_RESPONSE']
+        try:
+            self.parseCapabilities(self.capabilities)
+        except ReaderConfigurationError:
+            logger.exception('Capabilities mismatch')
+            raise
+
+        self.processDeferreds(msgName, lmsg.isSuccess())
+
+        def get_reader_config_cb(state, is_success, *args):
+            if is_success:
+                self.setState(LLRPReaderState.STATE_SENT_GET_CONFIG)
+            else:
+                self.panic(None, 'GET_READER_CONFIG failed')
+
+        if self.disconnecting:
+            return
+        self.send_GET_READER_CONFIG(onCompletion=get_reader_config_cb)
+
+    def _handle_sent_get_config(self, msgName, lmsg):
+        if msgName not in ('GET_READER_CONFIG_RESPONSE',
+                           'DELETE_ACCESSSPEC_RESPONSE',
+                           'DELETE_ROSPEC_RESPONSE'):
+            logger.error('unexpected response %s getting config',
+                         msgName)
+            raise ReaderConfigurationError(
+                "Unexpected response while getting reader config")
+
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s getting reader config: %s', status, err)
+            raise ReaderConfigurationError("Error getting reader config")
+
+        if msgName == 'GET_READER_CONFIG_RESPONSE':
+            self.reader_config = lmsg.msgdict['GET_READER_CONFIG_RESPONSE']
             try:
-                self.parseCapabilities(self.capabilities)
+                self.parseReaderConfig(self.reader_config)
             except ReaderConfigurationError:
-                logger.exception('Capabilities mismatch')
+                logger.exception('Reader config mismatch')
                 raise
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
-
-            def get_reader_config_cb(state, is_success, *args):
-                if is_success:
-                    self.setState(LLRPReaderState.STATE_SENT_GET_CONFIG)
-                else:
-                    self.panic(None, 'GET_READER_CONFIG failed')
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
-            if self.disconnecting:
-                return
-            self.send_GET_READER_CONFIG(onCompletion=get_reader_config_cb)
-
-        elif self.state == LLRPReaderState.STATE_SENT_GET_CONFIG:
-            if msgName not in ('GET_READER_CONFIG_RESPONSE',
-                               'DELETE_ACCESSSPEC_RESPONSE',
-                               'DELETE_ROSPEC_RESPONSE'):
-                logger.error('unexpected response %s getting config',
-                             msgName)
-                raise ReaderConfigurationError(
-                    "Unexpected response while getting reader config")
-
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s getting reader config: %s', status, err)
-                raise ReaderConfigurationError("Error getting reader config")
-
-            if msgName == 'GET_READER_CONFIG_RESPONSE':
-                self.reader_config = lmsg.msgdict['GET_READER_CONFIG_RESPONSE']
-                try:
-                    self.parseReaderConfig(self.reader_config)
-                except ReaderConfigurationError:
-                    logger.exception('Reader config mismatch')
-                    raise
+        def set_reader_config_cb(state, is_success, *args):
+            if is_success:
+                self.setState(LLRPReaderState.STATE_SENT_SET_CONFIG)
+            else:
+                self.panic(None, 'SET_READER_CONFIG failed')
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        if self.disconnecting:
+            return
+        self.send_ENABLE_EVENTS_AND_REPORTS()
+        self.send_SET_READER_CONFIG(onCompletion=set_reader_config_cb)
+
+    def _handle_sent_set_config(self, msgName, lmsg):
+        if msgName not in ('SET_READER_CONFIG_RESPONSE',
+                           'GET_READER_CONFIG_RESPONSE',
+                           'DELETE_ACCESSSPEC_RESPONSE'):
+            logger.error('unexpected response %s setting config', msgName)
+            raise ReaderConfigurationError(
+                "Unexpected response while setting reader config")
+
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s setting reader config: %s', status, err)
+            raise ReaderConfigurationError("Error setting reader config")
+
+        self.processDeferreds(msgName, lmsg.isSuccess())
+
+        if self.disconnecting:
+            return
 
-            def set_reader_config_cb(state, is_success, *args):
+        if self.config.reset_on_connect:
+            def on_politely_stopped_cb(state, is_success, *args):
                 if is_success:
-                    self.setState(LLRPReaderState.STATE_SENT_SET_CONFIG)
-                else:
-                    self.panic(None, 'SET_READER_CONFIG failed')
-
-            if self.disconnecting:
-                return
-            self.send_ENABLE_EVENTS_AND_REPORTS()
-            self.send_SET_READER_CONFIG(onCompletion=set_reader_config_cb)
-
-        elif self.state == LLRPReaderState.STATE_SENT_SET_CONFIG:
-            if msgName not in ('SET_READER_CONFIG_RESPONSE',
-                               'GET_READER_CONFIG_RESPONSE',
-                               'DELETE_ACCESSSPEC_RESPONSE'):
-                logger.error('unexpected response %s setting config', msgName)
-                raise ReaderConfigurationError(
-                    "Unexpected response while setting reader config")
-
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s setting reader config: %s', status, err)
-                raise ReaderConfigurationError("Error setting reader config")
-
-            self.processDeferreds(msgName, lmsg.isSuccess())
-
-            if self.disconnecting:
-                return
-
-            if self.config.reset_on_connect:
-                def on_politely_stopped_cb(state, is_success, *args):
-                    if is_success:
-                        self.setState(LLRPReaderState.STATE_CONNECTED)
-                        if self.config.start_inventory:
-                            self.startInventory()
+                    self.setState(LLRPReaderState.STATE_CONNECTED)
+                    if self.config.start_inventory:
+                        self.startInventory()
 
-                self.stopPolitely(onCompletion=on_politely_stopped_cb)
-            elif self.config.start_inventory:
-                self.startInventory()
+            self.stopPolitely(onCompletion=on_politely_stopped_cb)
+        elif self.config.start_inventory:
+            self.startInventory()
 
+    def _handle_sent_add_rospec(self, msgName, lmsg):
         # in state SENT_ADD_ROSPEC, expect only ADD_ROSPEC_RESPONSE; respond to
         # favorable ADD_ROSPEC_RESPONSE by enabling the added ROSpec and
         # advancing to state SENT_ENABLE_ROSPEC.
-        elif self.state == LLRPReaderState.STATE_SENT_ADD_ROSPEC:
-            if msgName != 'ADD_ROSPEC_RESPONSE':
-                logger.error('unexpected response %s when adding ROSpec',
-                             msgName)
-                raise ReaderConfigurationError(
-                    "Unexpected response while adding ROSpec")
+        if msgName != 'ADD_ROSPEC_RESPONSE':
+            logger.error('unexpected response %s when adding ROSpec',
+                         msgName)
+            raise ReaderConfigurationError(
+                "Unexpected response while adding ROSpec")
 
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s adding ROSpec: %s', status, err)
-                raise ReaderConfigurationError("Error adding ROSpec")
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s adding ROSpec: %s', status, err)
+            raise ReaderConfigurationError("Error adding ROSpec")
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
+    def _handle_sent_enable_rospec(self, msgName, lmsg):
         # in state SENT_ENABLE_ROSPEC, expect only ENABLE_ROSPEC_RESPONSE;
         # respond to favorable ENABLE_ROSPEC_RESPONSE by starting the enabled
         # ROSpec and advancing to state SENT_START_ROSPEC.
-        elif self.state == LLRPReaderState.STATE_SENT_ENABLE_ROSPEC:
-            if msgName != 'ENABLE_ROSPEC_RESPONSE':
-                logger.error('unexpected response %s when enabling ROSpec',
-                             msgName)
-                return
+        if msgName != 'ENABLE_ROSPEC_RESPONSE':
+            logger.error('unexpected response %s when enabling ROSpec',
+                         msgName)
+            return
 
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.fatal('Error %s enabling ROSpec: %s', status, err)
-                return
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.fatal('Error %s enabling ROSpec: %s', status, err)
+            return
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
+    def _handle_pausing(self, msgName, lmsg):
         # in state PAUSING, we have sent a DISABLE_ROSPEC, so expect only
         # DISABLE_ROSPEC_RESPONSE.  advance to state PAUSED.
-        elif self.state == LLRPReaderState.STATE_PAUSING:
-            if msgName != 'DISABLE_ROSPEC_RESPONSE':
-                logger.error('unexpected response %s '
-                             ' when disabling ROSpec', msgName)
+        if msgName != 'DISABLE_ROSPEC_RESPONSE':
+            logger.error('unexpected response %s '
+                         ' when disabling ROSpec', msgName)
 
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.error('DISABLE_ROSPEC failed with status %s: %s',
-                             status, err)
-                logger.warn('Error %s disabling ROSpec: %s', status, err)
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.error('DISABLE_ROSPEC failed with status %s: %s',
+                         status, err)
+            logger.warn('Error %s disabling ROSpec: %s', status, err)
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
+    def _handle_sent_start_rospec(self, msgName, lmsg):
         # in state SENT_START_ROSPEC, expect only START_ROSPEC_RESPONSE;
         # respond to favorable START_ROSPEC_RESPONSE by advancing to state
         # INVENTORYING.
-        elif self.state == LLRPReaderState.STATE_SENT_START_ROSPEC:
-            if msgName == 'RO_ACCESS_REPORT':
-                return
-            if msgName == 'READER_EVENT_NOTIFICATION':
-                return
-            if msgName != 'START_ROSPEC_RESPONSE':
-                logger.error('unexpected response %s when starting ROSpec',
-                             msgName)
-
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.error('START_ROSPEC failed with status %s: %s',
-                             status, err)
-                logger.fatal('Error %s starting ROSpec: %s', status, err)
-                return
-
-            self.processDeferreds(msgName, lmsg.isSuccess())
-
-        elif self.state == LLRPReaderState.STATE_INVENTORYING:
-            if msgName not in ('RO_ACCESS_REPORT',
-                               'READER_EVENT_NOTIFICATION',
-                               'ADD_ACCESSSPEC_RESPONSE',
-                               'ENABLE_ACCESSSPEC_RESPONSE',
-                               'DISABLE_ACCESSSPEC_RESPONSE',
-                               'DELETE_ACCESSSPEC_RESPONSE'):
-                logger.error('unexpected message %s while inventorying',
-                             msgName)
-                return
-
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        if msgName == 'RO_ACCESS_REPORT':
+            return
+        if msgName == 'READER_EVENT_NOTIFICATION':
+            return
+        if msgName != 'START_ROSPEC_RESPONSE':
+            logger.error('unexpected response %s when starting ROSpec',
+                         msgName)
+
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.error('START_ROSPEC failed with status %s: %s',
+                         status, err)
+            logger.fatal('Error %s starting ROSpec: %s', status, err)
+            return
 
-        elif self.state == LLRPReaderState.STATE_SENT_DELETE_ACCESSSPEC:
-            if msgName != 'DELETE_ACCESSSPEC_RESPONSE':
-                logger.error('unexpected response %s when deleting AccessSpec',
-                             msgName)
+        self.processDeferreds(msgName, lmsg.isSuccess())
+
+    def _handle_inventorying(self, msgName, lmsg):
+        if msgName not in ('RO_ACCESS_REPORT',
+                           'READER_EVENT_NOTIFICATION',
+                           'ADD_ACCESSSPEC_RESPONSE',
+                           'ENABLE_ACCESSSPEC_RESPONSE',
+                           'DISABLE_ACCESSSPEC_RESPONSE',
+                           'DELETE_ACCESSSPEC_RESPONSE'):
+            logger.error('unexpected message %s while inventorying',
+                         msgName)
+            return
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
-        elif self.state == LLRPReaderState.STATE_SENT_DELETE_ROSPEC:
-            if msgName != 'DELETE_ROSPEC_RESPONSE':
-                logger.error('unexpected response %s when deleting ROSpec',
-                             msgName)
+    def _handle_sent_delete_accessspec(self, msgName, lmsg):
+        if msgName != 'DELETE_ACCESSSPEC_RESPONSE':
+            logger.error('unexpected response %s when deleting AccessSpec',
+                         msgName)
 
-            if not lmsg.isSuccess():
-                status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
-                err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
-                logger.error('DELETE_ROSPEC failed with status %s: %s',
-                             status, err)
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
-            self.processDeferreds(msgName, lmsg.isSuccess())
+    def _handle_sent_delete_rospec(self, msgName, lmsg):
+        if msgName != 'DELETE_ROSPEC_RESPONSE':
+            logger.error('unexpected response %s when deleting ROSpec',
+                         msgName)
 
+        if not lmsg.isSuccess():
+            status = lmsg.msgdict[msgName]['LLRPStatus']['StatusCode']
+            err = lmsg.msgdict[msgName]['LLRPStatus']['ErrorDescription']
+            logger.error('DELETE_ROSPEC failed with status %s: %s',
+                         status, err)
 
-        else:
-            logger.warn('message %s received in unknown state!', msgName)
-
-        if self._deferreds[msgName]:
-            logger.error('there should NOT be Deferreds left for %s,'
-                         ' but there are!', msgName)
+        self.processDeferreds(msgName, lmsg.isSuccess())
 
     def panic(self, failure, *args):
         logger.error('panic(): %s', args)
@@ -793,49 +946,33 @@ class LLRPClient(object):
         logger.warn('complain(): %s', args)
 
     def send_KEEPALIVE_ACK(self):
-        self.sendMessage({
-            'KEEPALIVE_ACK': {}
-        })
+        self.sendPrebuiltMessage('KEEPALIVE_ACK')
 
     def send_ENABLE_IMPINJ_EXTENSIONS(self, onCompletion):
-        self.sendMessage({
-            'IMPINJ_ENABLE_EXTENSIONS': {}
-        })
+        self.sendPrebuiltMessage('IMPINJ_ENABLE_EXTENSIONS')
         self.setState(LLRPReaderState.STATE_SENT_ENABLE_IMPINJ_EXTENSIONS)
         self._deferreds['IMPINJ_ENABLE_EXTENSIONS_RESPONSE'].append(onCompletion)
 
     def send_GET_READER_CAPABILITIES(self, _, onCompletion):
-        self.sendMessage({
-            'GET_READER_CAPABILITIES': {
-                'RequestedData': Capability_Name2Type['All']
-            }})
+        self.sendPrebuiltMessage('GET_READER_CAPABILITIES')
         self.setState(LLRPReaderState.STATE_SENT_GET_CAPABILITIES)
         self._deferreds['GET_READER_CAPABILITIES_RESPONSE'].append(
             onCompletion)
 
     def send_GET_READER_CONFIG(self, onCompletion):
-        cfg = {
-            'RequestedData': Capability_Name2Type['All']
-        }
         if self.config.impinj_extended_configuration:
             # NOTE: Not really useful, as default value when impinj extensions
             # are enabled.
-            cfg['ImpinjRequestedData'] = {
-                    # per Octane LLRP guide:
-                    # 2000 = All configuration params
-                    'RequestedData': 2000
-            }
-        self.sendMessage({
-            'GET_READER_CONFIG': cfg
-        })
+            self._sendPrebuilt('GET_READER_CONFIG',
+                               PREBUILT_IMPINJ_GET_READER_CONFIG)
+        else:
+            self.sendPrebuiltMessage('GET_READER_CONFIG')
         self.setState(LLRPReaderState.STATE_SENT_GET_CONFIG)
         self._deferreds['GET_READER_CONFIG_RESPONSE'].append(
             onCompletion)
 
     def send_ENABLE_EVENTS_AND_REPORTS(self):
-        self.sendMessage({
-            'ENABLE_EVENTS_AND_REPORTS': {}
-        })
+        self.sendPrebuiltMessage('ENABLE_EVENTS_AND_REPORTS')
 
     def send_SET_READER_CONFIG(self, onCompletion):
         msg = {
@@ -893,18 +1030,12 @@ class LLRPClient(object):
         self._deferreds['ADD_ROSPEC_RESPONSE'].append(onCompletion)
 
     def send_ENABLE_ROSPEC(self, _, rospec, onCompletion):
-        self.sendMessage({
-            'ENABLE_ROSPEC': {
-                'ROSpecID': rospec['ROSpecID']
-            }})
+        self.sendSpecIdMessage('ENABLE_ROSPEC', rospec['ROSpecID'])
         self.setState(LLRPReaderState.STATE_SENT_ENABLE_ROSPEC)
         self._deferreds['ENABLE_ROSPEC_RESPONSE'].append(onCompletion)
 
     def send_START_ROSPEC(self, _, rospec, onCompletion):
-        self.sendMessage({
-            'START_ROSPEC': {
-                'ROSpecID': rospec['ROSpecID']
-            }})
+        self.sendSpecIdMessage('START_ROSPEC', rospec['ROSpecID'])
         self.setState(LLRPReaderState.STATE_SENT_START_ROSPEC)
         self._deferreds['START_ROSPEC_RESPONSE'].append(onCompletion)
 
@@ -916,19 +1047,13 @@ class LLRPClient(object):
         self._deferreds['ADD_ACCESSSPEC_RESPONSE'].append(onCompletion)
 
     def send_DISABLE_ACCESSSPEC(self, accessSpecID=1, onCompletion=None):
-        self.sendMessage({
-            'DISABLE_ACCESSSPEC': {
-                'AccessSpecID': accessSpecID,
-            }})
+        self.sendSpecIdMessage('DISABLE_ACCESSSPEC', accessSpecID)
 
         if onCompletion:
             self._deferreds['DISABLE_ACCESSSPEC_RESPONSE'].append(onCompletion)
 
     def send_ENABLE_ACCESSSPEC(self, _, accessSpecID, onCompletion=None):
-        self.sendMessage({
-            'ENABLE_ACCESSSPEC': {
-                'AccessSpecID': accessSpecID,
-            }})
+        self.sendSpecIdMessage('ENABLE_ACCESSSPEC', accessSpecID)
 
         if onCompletion:
             self._deferreds['ENABLE_ACCESSSPEC_RESPONSE'].append(onCompletion)
@@ -936,10 +1061,8 @@ class LLRPClient(object):
     def send_DELETE_ACCESSSPEC(self, accessSpecID=1,
                                onCompletion=None):
         # logger.info('Deleting current accessSpec.')
-        self.sendMessage({
-            'DELETE_ACCESSSPEC': {
-                'AccessSpecID': accessSpecID  # ONE AccessSpec
-            }})
+        # ONE AccessSpec
+        self.sendSpecIdMessage('DELETE_ACCESSSPEC', accessSpecID)
 
         if onCompletion:
             self._deferreds['DELETE_ACCESSSPEC_RESPONSE'].append(onCompletion)
@@ -1074,31 +1197,21 @@ class LLRPClient(object):
 
         logger.info('starting inventory')
 
-        # upside-down chain of callbacks: add, enable, start ROSpec
-        # started_rospec = defer.Deferred()
-        # started_rospec.addCallback(self._setState_wrapper,
-        #                            LLRPReaderState.STATE_INVENTORYING)
-        # started_rospec.addErrback(self.panic, 'START_ROSPEC failed')
-        # logger.debugfast('made started_rospec')
-
-        def enabled_rospec_cb(state, is_success, *args):
-            if is_success:
-                self.setState(LLRPReaderState.STATE_INVENTORYING)
-            else:
-                self.panic(None, 'ENABLE_ROSPEC failed')
-
-        logger.debugfast('made enabled_rospec')
+        # chain of callbacks: add ROSpec, then enable it
+        self.send_ADD_ROSPEC(rospec, onCompletion=self._added_rospec_cb)
 
-        def send_added_rospec_cb(state, is_success, *args):
-            if is_success:
-                self.send_ENABLE_ROSPEC(state, rospec,
-                                        onCompletion=enabled_rospec_cb)
-            else:
-                self.panic(None, 'ADD_ROSPEC failed')
-
-        logger.debugfast('made added_rospec')
+    def _added_rospec_cb(self, state, is_success, *args):
+        if is_success:
+            self.send_ENABLE_ROSPEC(state, self.rospec,
+                                    onCompletion=self._enabled_rospec_cb)
+        else:
+            self.panic(None, 'ADD_ROSPEC failed')
 
-        self.send_ADD_ROSPEC(rospec, onCompletion=send_added_rospec_cb)
+    def _enabled_rospec_cb(self, state, is_success, *args):
+        if is_success:
+            self.setState(LLRPReaderState.STATE_INVENTORYING)
+        else:
+            self.panic(None, 'ENABLE_ROSPEC failed')
 
     def getROSpec(self, force_new=False):
         if self.rospec and not force_new:
@@ -1137,11 +1250,7 @@ class LLRPClient(object):
         logger.info('stopping politely')
         if disconnect:
             self.disconnecting = True
-        self.sendMessage({
-            'DELETE_ACCESSSPEC': {
-                # all AccessSpecs
-                'AccessSpecID': 0,
-            }})
+        self.sendPrebuiltMessage('DELETE_ACCESSSPEC')
         self.setState(LLRPReaderState.STATE_SENT_DELETE_ACCESSSPEC)
 
         def send_delete_accessspec_cb(state, is_success, *args):
@@ -1156,10 +1265,7 @@ class LLRPClient(object):
             send_delete_accessspec_cb)
 
     def stopAllROSpecs(self, onCompletion=None):
-        self.sendMessage({
-            'DELETE_ROSPEC': {
-                'ROSpecID': 0
-            }})
+        self.sendPrebuiltMessage('DELETE_ROSPEC')
         self.setState(LLRPReaderState.STATE_SENT_DELETE_ROSPEC)
 
         def stop_all_rospecs_cb(state, is_success, *args):
@@ -1179,17 +1285,17 @@ class LLRPClient(object):
             self.capabilities['RegulatoryCapabilities']['UHFBandCapabilities']
         @return: a list of [0, dBm value, dBm value, ...]
 
-        >>> LLRPReaderState.parsePowerTable({'TransmitPowerLevelTableEntry': \
-            {'Index': 1, 'TransmitPowerValue': 3225}})
+        >>> LLRPClient.parsePowerTable({'TransmitPowerLevelTableEntry': \
+            [{'Index': 1, 'TransmitPowerValue': 3225}]})
         [0, 32.25]
-        >>> LLRPReaderState.parsePowerTable({})
+        >>> LLRPClient.parsePowerTable({'TransmitPowerLevelTableEntry': []})
         [0]
         """
         bandtbl = uhfbandcap['TransmitPowerLevelTableEntry']
         tx_power_table = [0] * (len(bandtbl) + 1)
+        # TransmitPowerValue is already decoded as an int
         for v in bandtbl:
-            idx = v['Index']
-            tx_power_table[idx] = int(v['TransmitPowerValue']) / 100.0
+            tx_power_table[v['Index']] = v['TransmitPowerValue'] / 100.0
 
         return tx_power_table
 
@@ -1207,25 +1313,24 @@ class LLRPClient(object):
             return {}
 
         logger.debugfast('requested tx_power: %s', tx_power)
-        min_power = self.tx_power_table.index(min(self.tx_power_table))
-        max_power = self.tx_power_table.index(max(self.tx_power_table))
+        min_power = self.tx_power_min_idx
+        max_power = self.tx_power_max_idx
 
         ret = {}
-        for antid, tx_power in tx_power.items():
-            if tx_power == 0:
+        for antid, ant_tx_power in tx_power.items():
+            if ant_tx_power == 0:
                 # tx_power = 0 means max power
-                max_power_dbm = max(self.tx_power_table)
-                tx_power = self.tx_power_table.index(max_power_dbm)
-                ret[antid] = (tx_power, max_power_dbm)
+                ret[antid] = (max_power, self.tx_power_max_dbm)
+                continue
 
             try:
-                power_dbm = self.tx_power_table[tx_power]
-                ret[antid] = (tx_power, power_dbm)
+                ret[antid] = (ant_tx_power,
+                              self.tx_power_table[ant_tx_power])
             except IndexError:
                 raise LLRPError('Invalid tx_power for antenna {}: '
                                 'requested={}, min_available={}, '
                                 'max_available={}'.format(
-                                    antid, tx_power, min_power,
+                                    antid, ant_tx_power, min_power,
                                     max_power))
         return ret
 
@@ -1291,10 +1396,7 @@ class LLRPClient(object):
 
         rospec = self.getROSpec(force_new=force_regen_rospec)
 
-        self.sendMessage({
-            'DISABLE_ROSPEC': {
-                'ROSpecID': rospec['ROSpecID']
-            }})
+        self.sendSpecIdMessage('DISABLE_ROSPEC', rospec['ROSpecID'])
         self.setState(LLRPReaderState.STATE_PAUSING)
 
         def disable_rospec_pause_cb(state, is_success, *args):
@@ -1343,6 +1445,30 @@ class LLRPClient(object):
         self.send_ENABLE_ROSPEC(None, self.rospec,
                                 onCompletion=enable_rospec_resume_cb)
 
+    def _next_msg_id(self):
+        if self.last_msg_id < LLRP_MSG_ID_MAX:
+            self.last_msg_id += 1
+        else:
+            self.last_msg_id = 1
+        return self.last_msg_id
+
+    def sendPrebuiltMessage(self, name):
+        """Send one of the PREBUILT_MESSAGES with a new message ID"""
+        return self._sendPrebuilt(name, PREBUILT_MESSAGES[name])
+
+    def sendSpecIdMessage(self, name, spec_id):
+        """Send one of the SPEC_ID_MESSAGES for the given spec ID"""
+        prebuilt = _prebuild_message(name, {SPEC_ID_MESSAGES[name]: spec_id})
+        return self._sendPrebuilt(name, prebuilt)
+
+    def _sendPrebuilt(self, name, prebuilt):
+        msgtype, vendorid, subtype, body = prebuilt
+        msg_id = self._next_msg_id()
+        self.transport_tx_write(msg_header_encode(msgtype, VER_PROTO_V1,
+                                                  len(body), msg_id,
+                                                  vendorid, subtype) + body)
+        return [(name, msg_id)]
+
     def sendMessage(self, msg_dict):
         """Serialize and send a dict LLRP Message
 
@@ -1350,17 +1476,12 @@ class LLRPClient(object):
         That should be ok.
         """
         sent_ids = []
-        for name in msg_dict:
-            if self.last_msg_id < LLRP_MSG_ID_MAX:
-                self.last_msg_id += 1
-            else:
-                self.last_msg_id = 1
-            msg_dict[name]['ID'] = self.last_msg_id
-            sent_ids.append((name, self.last_msg_id))
-        llrp_msg = LLRPMessage(msgdict=msg_dict)
-
-        assert llrp_msg.msgbytes, "LLRPMessage is empty"
-        self.transport_tx_write(llrp_msg.msgbytes)
+        for name, msgitem in iteritems(msg_dict):
+            msg_id = self._next_msg_id()
+            msgitem['ID'] = msg_id
+            sent_ids.append((name, msg_id))
+            # No need for an LLRPMessage, only the bytes are sent
+            self.transport_tx_write(encode_message(name, msgitem))
 
         return sent_ids
 
@@ -1479,13 +1600,19 @@ class LLRPReaderClient(object):
 
         self._socket = None
         self._socket_thread = None
+        # data waiting for the socket to be writable
+        self._tx_queue = deque()
+        self._tx_lock = Lock()
         # Needed?
         self.disconnect_requested = Event()
         self._stop_main_loop = Event()
 
         # for partial data transfers
         self.expected_bytes = 0
-        self.partial_data = b''
+        self.partial_data = bytearray()
+        # socket reads go to this buffer, allocated once
+        self._rx_buffer = bytearray(RECV_BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx_buffer)
 
         if config:
             self.config = config
@@ -1617,6 +1744,9 @@ class LLRPReaderClient(object):
             self._socket.connect((self._host, self._port))
             self._socket.setsockopt(SOL_SOCKET, SO_KEEPALIVE, 1)
             self._socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+            # Sends are queued when the reader is slow to read them, so that
+            # receiving is never blocked by a stalled write
+            self._socket.setblocking(False)
         except:
             self._socket = None
             raise
@@ -1680,14 +1810,19 @@ class LLRPReaderClient(object):
     def hard_disconnect(self):
         """Stop the recv worker, and close sockets"""
         self._stop_main_loop.set()
+        # Detach the socket under the send lock so that no sender can use it
+        # once it is closed
+        with self._tx_lock:
+            sock = self._socket
+            self._socket = None
+            self._tx_queue.clear()
         # stop listening thread.
-        if self._socket:
+        if sock:
             try:
-                self._socket.shutdown(SHUT_RDWR)
+                sock.shutdown(SHUT_RDWR)
             except:
                 pass
-            self._socket.close()
-            self._socket = None
+            sock.close()
 
     @staticmethod
     def disconnect_all_readers(timeout_per_reader=1, force=True):
@@ -1800,22 +1935,49 @@ class LLRPReaderClient(object):
         try:
             while True:
                 lost_connection = False
-                socket_list = [self._socket]
+                with self._tx_lock:
+                    sock = self._socket
+                    tx_pending = bool(self._tx_queue)
+                if not sock:
+                    # Closed by a disconnect
+                    break
+                socket_list = [sock]
+                # Wait for the socket to be writable too if sends are pending
+                write_list = socket_list if tx_pending else []
                 # Get the list sockets which are readable
                 read_sockets, write_sockets, error_sockets = \
-                    select.select(socket_list, [], [])
-                for sock in read_sockets:
+                    select.select(socket_list, write_list, [])
+                if write_sockets:
+                    try:
+                        with self._tx_lock:
+                            self._send_pending()
+                    except ReaderConfigurationError:
+                        # Socket closed by a disconnect in the meantime
+                        pass
+                    except SocketError:
+                        logger.exception('\nDisconnected from server')
+                        lost_connection = True
+                for read_sock in read_sockets:
                     # Incoming message from remote server
-                    if sock == self._socket:
+                    if read_sock is sock:
                         try:
-                            data = sock.recv(4096)
-                            if data:
-                                self.raw_data_received(data)
+                            nbytes = read_sock.recv_into(self._rx_buffer)
+                            if nbytes:
+                                # Handled in place: only the messages to
+                                # decode and an incomplete tail are copied
+                                self.raw_data_received(
+                                    self._rx_view[:nbytes])
                             else:
                                 # Zero byte received == disconnected
                                 logger.warning('\nDisconnected from server')
                                 lost_connection = True
-                        except SocketError:
+                        except SocketError as exc:
+                            if exc.errno in (EAGAIN, EWOULDBLOCK):
+                                # Spurious wakeup, nothing to read yet
+                                continue
+                            if self._stop_main_loop.is_set():
+                                # Socket closed on purpose by a disconnect
+                                break
                             logger.exception('\nDisconnected from server')
                             lost_connection = True
                         except ReaderConfigurationError:
@@ -1837,69 +1999,182 @@ class LLRPReaderClient(object):
                         # we can continue the loop with a socket that should
                         # have been updated
                         self._stop_main_loop.clear()
-        except:
+        except Exception:
             logger.exception("Exception encountered in main loop, exiting...")
-
-        self._socket_thread = None
+        finally:
+            self._socket_thread = None
 
     def send_data(self, data):
-        if not self._socket:
+        with self._tx_lock:
+            if not self._socket:
+                raise ReaderConfigurationError('Not connected')
+            self._tx_queue.append(data)
+            if self._send_pending():
+                return
+        if current_thread() is not self._socket_thread:
+            # The main loop only waits for writability once it is woken up
+            # by incoming data, so flush from the calling thread instead.
+            self._flush_pending(self._socktimeout)
+
+    def _send_pending(self):
+        """Send as much queued data as possible without blocking.
+
+        Must be called with _tx_lock held. Returns True if everything was sent.
+        """
+        sock = self._socket
+        if not sock:
             raise ReaderConfigurationError('Not connected')
-        self._socket.sendall(data)
+        tx_queue = self._tx_queue
+        while tx_queue:
+            if len(tx_queue) > 1:
+                # Coalesce the pending messages to send them in one syscall
+                data = b''.join(tx_queue)
+                tx_queue.clear()
+                tx_queue.append(data)
+            else:
+                data = tx_queue[0]
+            try:
+                sent = sock.send(data)
+            except SocketError as exc:
+                if exc.errno in (EAGAIN, EWOULDBLOCK):
+                    return False
+                raise
+            if sent < len(data):
+                tx_queue[0] = data[sent:]
+                return False
+            tx_queue.popleft()
+        return True
+
+    def _flush_pending(self, timeout):
+        """Wait up to timeout seconds overall for the queued data to be sent
+
+        A timeout of None waits for as long as needed.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        remaining = None
+        while True:
+            with self._tx_lock:
+                sock = self._socket
+            if not sock:
+                raise ReaderConfigurationError('Not connected')
+            if deadline is not None:
+                # Partial writes do not extend the overall timeout
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise SocketTimeout('timed out')
+            _, write_sockets, _ = select.select([], [sock], [], remaining)
+            if not write_sockets:
+                raise SocketTimeout('timed out')
+            with self._tx_lock:
+                if self._send_pending():
+                    return
 
     def raw_data_received(self, data):
+        """Handle data received from the reader.
+
+        data can be bytes or a memoryview, that is not used after the return.
+        """
         data_len = len(data)
-        if is_general_debug_enabled():
+        # Checked once for all the messages of this chunk of data
+        debug = is_general_debug_enabled()
+        if debug:
             logger.debugfast('got %d bytes from reader: %s', data_len,
                              hexlify(data))
 
         if self.expected_bytes:
-            self.partial_data += data
-            data = self.partial_data
-            data_len = len(data)
+            # Accumulate in place, large reports can span many reads
+            partial_data = self.partial_data
+            partial_data += data
+            data_len = len(partial_data)
             if data_len < self.expected_bytes:
                 # still not enough; wait until next time
                 return
-
-        start_pos = 0
-        while data_len > 0:
-            # parse the message header to grab its length
-            if data_len >= msg_header_len:
-                msg_type, msg_len, message_id = msg_header_unpack(
-                    data[start_pos:start_pos + msg_header_len])
+            data = bytes(partial_data)
+            del partial_data[:]
+
+        messages = self._split_messages(data, debug)
+
+        for msg_type, start_pos, msg_len in messages:
+            if msg_type == MSG_TYPE_KEEPALIVE and \
+                    not self._wants_message('KEEPALIVE'):
+                if debug:
+                    logger.debugfast('got KEEPALIVE, acknowledging it')
+                self.llrp.send_KEEPALIVE_ACK()
+                continue
+            if msg_type == MSG_TYPE_RO_ACCESS_REPORT and \
+                    not self._wants_message('RO_ACCESS_REPORT'):
+                if debug:
+                    logger.debugfast('discarding RO_ACCESS_REPORT, no '
+                                     'listener')
+                continue
+            if msg_type == MSG_TYPE_READER_EVENT_NOTIFICATION and \
+                    not self._wants_message('READER_EVENT_NOTIFICATION'):
+                if debug:
+                    logger.debugfast('discarding READER_EVENT_NOTIFICATION, '
+                                     'no listener')
+                continue
+            if msg_len != data_len:
+                msgbytes = data[start_pos:start_pos + msg_len]
             else:
-                logger.warning('Too few bytes (%d) to unpack message header',
-                               data_len)
-                self.partial_data = data[start_pos:]
-                self.expected_bytes = msg_header_len
+                # Most common case: a single message in the buffer
+                msgbytes = data
+            if type(msgbytes) is memoryview:
+                # Decoded values keep references to the message bytes
+                msgbytes = msgbytes.tobytes()
+            try:
+                lmsg = LLRPMessage.from_bytes(msgbytes)
+                self._on_llrp_message_received(lmsg)
+                self.llrp.handleMessage(lmsg)
+            except ReaderConfigurationError:
+                raise
+            except LLRPError:
+                logger.exception('Failed to decode LLRPMessage; '
+                                 'will not decode %d remaining bytes',
+                                 data_len - start_pos)
+                del self.partial_data[:]
+                self.expected_bytes = 0
                 break
 
-            logger.debugfast('expect %d bytes (have %d)', msg_len, data_len)
+    def _split_messages(self, data, debug=False):
+        """Locate the complete messages available in data.
 
-            if data_len < msg_len:
+        Returns a list of (msg_type, start_pos, msg_len) tuples, the trailing
+        incomplete message, if any, is kept for the next call.
+        """
+        data_len = len(data)
+        # local aliases for the scan loop
+        hdr_len = msg_header_len
+        hdr_unpack_from = msg_header_unpack_from
+        messages = []
+        start_pos = 0
+        while data_len - start_pos >= hdr_len:
+            msg_type, msg_len, message_id = hdr_unpack_from(data, start_pos)
+            if msg_len < hdr_len:
+                logger.error('Invalid message length (%d), dropping %d '
+                             'bytes', msg_len, data_len - start_pos)
+                start_pos = data_len
+                break
+            if debug:
+                logger.debugfast('expect %d bytes (have %d)', msg_len,
+                                 data_len - start_pos)
+            if data_len - start_pos < msg_len:
                 # got too few bytes
-                self.partial_data = data[start_pos:]
-                self.expected_bytes = msg_len
                 break
+            messages.append((msg_type & 0x03FF, start_pos, msg_len))
+            start_pos += msg_len
+
+        if start_pos < data_len:
+            self.partial_data += data[start_pos:]
+            if data_len - start_pos < hdr_len:
+                logger.warning('Too few bytes (%d) to unpack message header',
+                               data_len - start_pos)
+                self.expected_bytes = hdr_len
             else:
-                # got at least the right number of bytes
-                self.expected_bytes = 0
-                try:
-                    lmsg = LLRPMessage(
-                        msgbytes=data[start_pos:start_pos + msg_len])
-                    self._on_llrp_message_received(lmsg)
-                    self.llrp.handleMessage(lmsg)
-                    start_pos += msg_len
-                    data_len -= msg_len
-                except ReaderConfigurationError:
-                    raise
-                except LLRPError:
-                    logger.exception('Failed to decode LLRPMessage; '
-                                     'will not decode %d remaining bytes',
-                                     data_len)
-                    break
-        if self.expected_bytes <= 0:
-            self.partial_data = b''
+                self.expected_bytes = msg_len
+        else:
+            self.expected_bytes = 0
+
+        return messages
 
     def start_access_spec(self, op_spec, target_spec=None, stop_after_count=0,
                           access_spec_id=1):
@@ -1940,12 +2215,22 @@ class LLRPReaderClient(object):
                 logger.exception("Error during state change callback execution"
                                  ". Continuing anyway...")
 
+    def _wants_message(self, msgName):
+        """Tell if a msgName message has to be decoded once received"""
+        return bool(self._llrp_message_callbacks.get(msgName)) or \
+            self.llrp.wants_message(msgName)
+
     def _on_llrp_message_received(self, lmsg):
         """Call user callbacks if needed"""
         msgName = lmsg.getName()
+        # Don't use [] on the defaultdict, that would add an empty list for
+        # each new message name received
+        callbacks = self._llrp_message_callbacks.get(msgName)
+        if not callbacks:
+            return
         # call per-message callbacks
         logger.debugfast('starting message callbacks for %s', msgName)
-        for fn in self._llrp_message_callbacks[msgName]:
+        for fn in callbacks:
             try:
                 fn(self, lmsg)
             except:
@@ -10,11 +10,13 @@ msg_header_struct = Struct('!HII')
 msg_header_size = msg_header_struct.size
 msg_header_pack = msg_header_struct.pack
 msg_header_unpack = msg_header_struct.unpack
+msg_header_unpack_from = msg_header_struct.unpack_from
 
 msg_vendor_subtype_struct = Struct('!IB')
 msg_vendor_subtype_size = msg_vendor_subtype_struct.size
 msg_vendor_subtype_pack = msg_vendor_subtype_struct.pack
 msg_vendor_subtype_unpack = msg_vendor_subtype_struct.unpack
+msg_vendor_subtype_unpack_from = msg_vendor_subtype_struct.unpack_from
 
 msg_header_custom_struct = Struct('!HIIIB')
 msg_header_custom_pack = msg_header_custom_struct.pack
@@ -25,22 +27,18 @@ msg_header_custom_size = msg_header_custom_struct.size
 tve_header_struct = Struct('!B')
 tve_header_size = tve_header_struct.size
 tve_header_unpack = tve_header_struct.unpack
+tve_header_unpack_from = tve_header_struct.unpack_from
 
 # TLV param header: Type, Size
 tlv_par_header_struct = Struct('!HH')
 tlv_par_header_size = tlv_par_header_struct.size
 tlv_par_header_unpack = tlv_par_header_struct.unpack
+tlv_par_header_unpack_from = tlv_par_header_struct.unpack_from
 
 par_vendor_subtype_struct = Struct('!II')
 par_vendor_subtype_size = par_vendor_subtype_struct.size
 par_vendor_subtype_unpack = par_vendor_subtype_struct.unpack
-
-
-## LEGACY to REMOVE
-# TLV param header: Type, Size
-nontve_header_struct = Struct('!HH')
-nontve_header_size = nontve_header_struct.size
-nontve_header_unpack = nontve_header_struct.unpack
+par_vendor_subtype_unpack_from = par_vendor_subtype_struct.unpack_from
 
 
 struct_short = Struct('!h')
@@ -81,6 +79,19 @@ TVE_PARAM_FORMATS = {
     20: ('C1G2XPCW2', struct_ushort),
 }
 
+# The decoded header of a TVE parameter only depends on its type, so build
+# them once: (partype, vendorid, subtype, hdr_len, full_length)
+# Indexed by the 7-bit type, None for the undefined types.
+TVE_PARAM_HEADERS = [None] * (TVE_PARAM_TYPE_MAX + 1)
+for partype, (_, param_struct) in TVE_PARAM_FORMATS.items():
+    TVE_PARAM_HEADERS[partype] = (partype, 0, 0, tve_header_size,
+                                  tve_header_size + param_struct.size)
+# The lookup tables are never modified after import
+TVE_PARAM_HEADERS = tuple(TVE_PARAM_HEADERS)
+# Same, indexed by the first byte of a parameter: the TVE flag is its MSB
+TVE_PARAM_HEADERS_BY_BYTE = (None,) * (TVE_PARAM_TYPE_MAX + 1) + \
+    TVE_PARAM_HEADERS
+
 
 def msg_header_encode(msgtype, version, length, msgid, vendorid=0, subtype=0):
     ver = version & 0x07
@@ -94,16 +105,16 @@ def msg_header_encode(msgtype, version, length, msgid, vendorid=0, subtype=0):
         return msg_header_pack((ver << 10) | msgtype,
                                msg_header_size + length, msgid)
 
-def msg_header_decode(data):
-    msgtype, length, msgid = msg_header_unpack(data[:msg_header_size])
+def msg_header_decode(data, offset=0):
+    msgtype, length, msgid = msg_header_unpack_from(data, offset)
     hdr_len = msg_header_size
     # & BITMASK(3)
     version = (msgtype >> 10) & 0x07
     # & BITMASK(10)
     msgtype = msgtype & 0x03FF
     if msgtype == TYPE_CUSTOM:
-        vendorid, subtype = msg_vendor_subtype_unpack(
-            data[hdr_len:hdr_len + msg_vendor_subtype_size])
+        vendorid, subtype = msg_vendor_subtype_unpack_from(data,
+                                                           offset + hdr_len)
         hdr_len += msg_vendor_subtype_size
     else:
         vendorid = 0
@@ -111,64 +122,53 @@ def msg_header_decode(data):
     return msgtype, vendorid, subtype, version, hdr_len, length, msgid
 
 
-def tlv_param_header_decode(data):
+def tlv_param_header_decode(data, offset=0):
     # Decode for normal param header (non-tve)
-    partype, length = tlv_par_header_unpack(data[:tlv_par_header_size])
+    partype, length = tlv_par_header_unpack_from(data, offset)
     hdr_len = tlv_par_header_size
     # ie partype & BITMASK(10)
     partype = partype & 0x03FF
     if partype != TYPE_CUSTOM:
         return partype, 0, 0, hdr_len, length
 
-    vendorid, subtype = par_vendor_subtype_unpack(
-        data[hdr_len:hdr_len + par_vendor_subtype_size])
+    vendorid, subtype = par_vendor_subtype_unpack_from(data, offset + hdr_len)
     hdr_len += par_vendor_subtype_size
     return partype, vendorid, subtype, hdr_len, length
 
 
-def tve_param_header_decode(data):
+def tve_param_header_decode(data, offset=0):
     """Generic byte decoding function for TVE parameters.
 
     Given an array of bytes, tries to interpret a TVE parameter from the
-    beginning of the array.  Returns the decoded data and the number of bytes
-    it read."""
-
-    # Most common case first
-    # decode the TVE field's header (1 bit "reserved" + 7-bit type)
-    tve_msgtype = tve_header_unpack(data[:tve_header_size])[0]
-
-    if not tve_msgtype & 0b10000000:
-        # Not a tve parameter
-        return None, 0, 0
+    given offset of the array.  Returns the decoded data and the number of
+    bytes it read."""
 
-    tve_msgtype = tve_msgtype & 0x7f
-    try:
-        param_name, param_struct = TVE_PARAM_FORMATS[tve_msgtype]
-        #logger.debugfast('found %s (type=%s)', param_name, tve_msgtype)
-    except KeyError:
+    # decode the TVE field's header (1 bit "reserved" + 7-bit type), None if
+    # not a tve parameter
+    header = TVE_PARAM_HEADERS_BY_BYTE[tve_header_unpack_from(data, offset)[0]]
+    if header is None:
         return None, 0, 0
 
-    # decode the body
-    length = tve_header_size + param_struct.size
+    return header[0], header[3], header[4]
 
-    return tve_msgtype, tve_header_size, length
 
-
-def param_header_decode(data):
-    vendorid = 0
-    subtype = 0
-
-    if len(data) < tve_header_size:
+def param_header_decode(data, offset=0):
+    if len(data) - offset < tve_header_size:
         # No parameter can be smaller than a tve_header
         return None, 0, 0, 0, 0
 
     # Check first for tve encoded parameters
-    partype, hdr_len, full_length = tve_param_header_decode(data)
-    if not partype:
-        (partype,
-         vendorid,
-         subtype,
-         hdr_len,
-         full_length) = tlv_param_header_decode(data)
-
-    return partype, vendorid, subtype, hdr_len, full_length
+    header = TVE_PARAM_HEADERS_BY_BYTE[tve_header_unpack_from(data, offset)[0]]
+    if header is not None:
+        return header
+
+    # Same as tlv_param_header_decode, inlined
+    partype, length = tlv_par_header_unpack_from(data, offset)
+    partype = partype & 0x03FF
+    if partype != TYPE_CUSTOM:
+        return partype, 0, 0, tlv_par_header_size, length
+
+    vendorid, subtype = par_vendor_subtype_unpack_from(
+        data, offset + tlv_par_header_size)
+    return (partype, vendorid, subtype,
+            tlv_par_header_size + par_vendor_subtype_size, length)
@@ -24,12 +24,16 @@
 from __future__ import unicode_literals
 import logging
 import struct
-from collections import defaultdict
 from binascii import hexlify, unhexlify
 
-from .util import BIT, BITMASK, reverse_dict, iteritems
+from .util import reverse_dict, iteritems
 from .llrp_decoder import (msg_header_encode, msg_header_decode,
-                           param_header_decode, par_vendor_subtype_size,
+                           msg_header_size, msg_header_pack,
+                           msg_header_unpack, tlv_par_header_struct,
+                           tve_header_struct, tve_header_unpack_from,
+                           param_header_decode, tlv_param_header_decode,
+                           TVE_PARAM_HEADERS_BY_BYTE,
+                           par_vendor_subtype_size,
                            par_vendor_subtype_unpack, TVE_PARAM_FORMATS,
                            TVE_PARAM_TYPE_MAX, TYPE_CUSTOM, VENDOR_ID_IMPINJ,
                            VENDOR_ID_MOTOROLA)
@@ -56,6 +60,9 @@ __all__ = [
     "get_message_name_from_type",
     "llrp_data2xml",
     "Message_struct",
+    "Message_Type2Decoder",
+    "Message_StdType2Decoder",
+    "Message_Name2Encoder",
     "msg_header_encode",
     "msg_header_decode",
     "Param_struct",
@@ -77,22 +84,18 @@ DEFAULT_HOPTABLE_INDEX = 1
 DECODE_ERROR_PARNAME = "SllurpDecodeError"
 
 
-msg_header = '!HII'
-msg_header_len = struct.calcsize(msg_header)
-msg_header_pack = struct.Struct(msg_header).pack
-msg_header_unpack = struct.Struct(msg_header).unpack
+# Header structs are shared with the decoder
+msg_header_len = msg_header_size
 
-par_header = '!HH'
-par_header_len = struct.calcsize(par_header)
-par_header_pack = struct.Struct(par_header).pack
-par_header_unpack = struct.Struct(par_header).unpack
-tve_header = '!B'
-tve_header_len = struct.calcsize(tve_header)
-tve_header_pack = struct.Struct(tve_header).pack
-tve_header_unpack = struct.Struct(tve_header).unpack
-par_custom_header = "!HHII"
-par_custom_header_len = struct.calcsize(par_custom_header)
-par_custom_header_pack = struct.Struct(par_custom_header).pack
+par_header_len = tlv_par_header_struct.size
+par_header_pack = tlv_par_header_struct.pack
+par_header_unpack = tlv_par_header_struct.unpack
+tve_header_len = tve_header_struct.size
+tve_header_pack = tve_header_struct.pack
+tve_header_unpack = tve_header_struct.unpack
+par_custom_header_struct = struct.Struct('!HHII')
+par_custom_header_len = par_custom_header_struct.size
+par_custom_header_pack = par_custom_header_struct.pack
 
 # Common types unpacks
 ubyte_size = struct.calcsize('!B')
@@ -322,9 +325,6 @@ ROReportTrigger_Name2Value = {
 
 ROReportTrigger_Value2Name = reverse_dict(ROReportTrigger_Name2Value)
 
-# v1.0:16.2.1.1.2.1 UHFC1G2RFModeTable, to be filled in by capabilities parser
-ModeIndex_Name2Type = defaultdict(int)
-
 # v1.0:16.2.1.1.2.1
 Modulation_Name2Type = {
     'FM0': 0,
@@ -357,6 +357,8 @@ for p_type, p_format in iteritems(TVE_PARAM_FORMATS):
     p_struct = {
         'type': p_type,
         'tv_encoded': True,
+        # Used by decode_param to decode the value without slicing it first
+        'tv_unpack_from': p_format[1].unpack_from,
         'fields': [],
         # TODO: encode tv parameters
         #'encode': local_encode,
@@ -446,10 +448,12 @@ def basic_auto_param_decode_generator(unpack_func, unpack_size, *args):
     return generated_func
 
 
-def decode_param(data):
+def decode_param(data, offset=0, header=None):
     """Decode any parameter to a byte sequence.
 
     :param data: byte sequence representing an LLRP parameter.
+    :param offset: position of the parameter in data.
+    :param header: header of the parameter if already decoded by the caller.
     :returns dict, bytes: where dict is {'Type': <decoded type>, 'Data':
         <decoded data>} and bytes is the remaining bytes trailing the bytes we
         could decode.
@@ -462,19 +466,32 @@ def decode_param(data):
      vendorid,
      subtype,
      hdr_len,
-     full_length) = param_header_decode(data)
+     full_length) = header or param_header_decode(data, offset)
 
     if not partype:
         # No parameter can be smaller than a tve_header
-        return None, None, data
+        return None, None, data[offset:]
+
+    if hdr_len == tve_header_len:
+        # Only known TV encoded parameters have a 1 byte header
+        param_name, decoder, unpack_from = TVE_Param_Type2Decoder[partype]
+        if unpack_from is not None:
+            return (param_name, unpack_from(data, offset + hdr_len)[0],
+                    full_length)
+        pardata = data[offset + hdr_len:offset + full_length]
+        return param_name, decoder(pardata, param_name)[0], full_length
 
-    pardata = data[hdr_len:full_length]
+    pardata = data[offset + hdr_len:offset + full_length]
 
-    param_name = Param_Type2Name.get((partype, vendorid, subtype))
+    if partype != TYPE_CUSTOM:
+        param_name, decoder = Param_StdType2Decoder[partype]
+    else:
+        param_name, decoder = Param_CustomKey2Decoder.get(
+            (vendorid << 32) | subtype, _UNKNOWN_PARAM_DECODER)
     if param_name:
-        try:
-            ret, _ = Param_struct[param_name]['decode'](pardata, param_name)
-        except KeyError:
+        if decoder is not None:
+            ret, _ = decoder(pardata, param_name)
+        else:
             logger.debugfast('"decode" func is missing for parameter %s',
                              param_name)
             decoder_error = 'DecodeFunctionMissing'
@@ -513,10 +530,32 @@ def decode_all_parameters(data, name=None, par_dict=None, n_fields=None):
     if n_fields is None:
         n_fields = []
 
+    # Local names for everything used in the loop
+    tve_param_headers = TVE_PARAM_HEADERS_BY_BYTE
+    tve_param_decoders = TVE_Param_Type2Decoder
+    tve_hdr_unpack_from = tve_header_unpack_from
+    tve_hdr_len = tve_header_len
+    tlv_hdr_decode = tlv_param_header_decode
+    decode_other_param = decode_param
     datalen = len(data)
     start_pos = 0
     while start_pos < datalen:
-        subname, ret, sublength = decode_param(data[start_pos:])
+        # TV encoded parameters, most of the content of tag reports, are
+        # decoded here directly. Others go through decode_param, with their
+        # header so that the first byte is not looked up again.
+        tve_header = tve_param_headers[
+            tve_hdr_unpack_from(data, start_pos)[0]]
+        if tve_header is not None:
+            sublength = tve_header[4]
+            subname, decoder, unpack_from = tve_param_decoders[tve_header[0]]
+            if unpack_from is not None:
+                ret = unpack_from(data, start_pos + tve_hdr_len)[0]
+            else:
+                ret = decoder(data[start_pos + tve_hdr_len:
+                                   start_pos + sublength], subname)[0]
+        else:
+            subname, ret, sublength = decode_other_param(
+                data, start_pos, tlv_hdr_decode(data, start_pos))
         if not subname:
             if ret is None:
                 raise LLRPError('Error decoding param. Invalid byte stream.')
@@ -542,7 +581,7 @@ def decode_all_parameters(data, name=None, par_dict=None, n_fields=None):
 def decode_generic_message(data, msg_name=None, msg=None):
     """Auto decode a standard LLRP message without 'individual' modification"""
     if msg is None:
-        msg = LLRPMessageDict()
+        msg = {}
     n_fields = []
     if msg_name:
         n_fields = Message_struct[msg_name]['n_fields']
@@ -836,15 +875,21 @@ Message_struct['ADD_ROSPEC_RESPONSE'] = {
 }
 
 
-# 16.1.5 DELETE_ROSPEC
+# The ROSpec and AccessSpec messages that only carry the spec id share their
+# encoders
+encode_ROSpecIDMessage = basic_param_encode_generator(uint_pack, 'ROSpecID')
+encode_AccessSpecIDMessage = basic_param_encode_generator(uint_pack,
+                                                          'AccessSpecID')
 
+
+# 16.1.5 DELETE_ROSPEC
 Message_struct['DELETE_ROSPEC'] = {
     'type': 21,
     'fields': [
         'ID',
         'ROSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'ROSpecID')
+    'encode': encode_ROSpecIDMessage
 }
 
 
@@ -868,7 +913,7 @@ Message_struct['START_ROSPEC'] = {
         'ID',
         'ROSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'ROSpecID')
+    'encode': encode_ROSpecIDMessage
 }
 
 
@@ -892,7 +937,7 @@ Message_struct['STOP_ROSPEC'] = {
         'ID',
         'ROSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'ROSpecID')
+    'encode': encode_ROSpecIDMessage
 }
 
 
@@ -910,19 +955,13 @@ Message_struct['STOP_ROSPEC_RESPONSE'] = {
 
 
 # 16.1.11 ENABLE_ROSPEC
-def encode_EnableROSpec(msg):
-    msgid = msg['ROSpecID']
-
-    return struct.pack('!I', msgid)
-
-
 Message_struct['ENABLE_ROSPEC'] = {
     'type': 24,
     'fields': [
         'ID',
         'ROSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'ROSpecID')
+    'encode': encode_ROSpecIDMessage
 }
 
 
@@ -946,7 +985,7 @@ Message_struct['DISABLE_ROSPEC'] = {
         'ID',
         'ROSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'ROSpecID')
+    'encode': encode_ROSpecIDMessage
 }
 
 
@@ -964,9 +1003,8 @@ Message_struct['DISABLE_ROSPEC_RESPONSE'] = {
 
 
 def decode_ROAccessReport(data, name=None):
-    msg = LLRPMessageDict()
     # Ensure that there is always a TagReportData, even empty
-    msg['TagReportData'] = []
+    msg = {'TagReportData': []}
     msg = decode_generic_message(data, name, msg)
     return msg
 
@@ -1111,7 +1149,7 @@ def decode_FrequencyInformation(data, name=None):
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
     par = {
-        'Hopping': flags & BIT(7) == BIT(7)
+        'Hopping': bool(flags & 0x80)
     }
 
     data = data[ubyte_size:]
@@ -1202,12 +1240,12 @@ def decode_C1G2LLRPCapabilities(data, name=None):
     (flags,
      par['MaxNumSelectFiltersPerQuery']) = ubyte_ushort_unpack(data)
 
-    par['CanSupportBlockErase'] = (flags & BIT(7) == BIT(7))
-    par['CanSupportBlockWrite'] = (flags & BIT(6) == BIT(6))
-    par['CanSupportBlockPermalock'] = (flags & BIT(5) == BIT(5))
-    par['CanSupportTagRecommissioning'] = (flags & BIT(4) == BIT(4))
-    par['CanSupportUMIMethod2'] = (flags & BIT(3) == BIT(3))
-    par['CanSupportXPC'] = (flags & BIT(2) == BIT(2))
+    par['CanSupportBlockErase'] = bool(flags & 0x80)
+    par['CanSupportBlockWrite'] = bool(flags & 0x40)
+    par['CanSupportBlockPermalock'] = bool(flags & 0x20)
+    par['CanSupportTagRecommissioning'] = bool(flags & 0x10)
+    par['CanSupportUMIMethod2'] = bool(flags & 0x08)
+    par['CanSupportXPC'] = bool(flags & 0x04)
 
     return par, ''
 
@@ -1261,7 +1299,7 @@ def decode_UHFC1G2RFModeTableEntry(data, name=None):
 
     # parse RC
     par['DR'] = RC >> 7
-    par['EPCHAGTCConformance'] = RC & BIT(6) == BIT(6)
+    par['EPCHAGTCConformance'] = bool(RC & 0x40)
 
     return par, ''
 
@@ -1313,11 +1351,11 @@ def decode_LLRPCapabilities(data, name=None):
      par['MaxNumAccessSpec'],
      par['MaxNumOpSpecsPerAccessSpec']) = llrp_capabilities_unpack(data)
 
-    par['CanDoRFSurvey'] = (flags & BIT(7) == BIT(7))
-    par['CanReportBufferFillWarning'] = (flags & BIT(6) == BIT(6))
-    par['SupportsClientRequestOpSpec'] = (flags & BIT(5) == BIT(5))
-    par['CanDoTagInventoryStateAwareSingulation'] = (flags & BIT(4) == BIT(4))
-    par['SupportsEventAndReportHolding'] = (flags & BIT(3) == BIT(3))
+    par['CanDoRFSurvey'] = bool(flags & 0x80)
+    par['CanReportBufferFillWarning'] = bool(flags & 0x40)
+    par['SupportsClientRequestOpSpec'] = bool(flags & 0x20)
+    par['CanDoTagInventoryStateAwareSingulation'] = bool(flags & 0x10)
+    par['SupportsEventAndReportHolding'] = bool(flags & 0x08)
 
     return par, ''
 
@@ -1358,8 +1396,8 @@ def decode_GeneralDeviceCapabilities(data, name=None):
      par['FirmwareVersionByteCount']) = \
          general_dev_capa_begin_unpack(data[:general_dev_capa_begin_size])
 
-    par['CanSetAntennaProperties'] = (flags & BIT(15) == BIT(15))
-    par['HasUTCClockCapability'] = (flags & BIT(14) == BIT(14))
+    par['CanSetAntennaProperties'] = bool(flags & 0x8000)
+    par['HasUTCClockCapability'] = bool(flags & 0x4000)
 
     pastVer = general_dev_capa_begin_size + par['FirmwareVersionByteCount']
     par['ReaderFirmwareVersion'] = data[general_dev_capa_begin_size:pastVer]
@@ -1597,7 +1635,7 @@ Message_struct['DELETE_ACCESSSPEC'] = {
         'ID',
         'AccessSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'AccessSpecID'),
+    'encode': encode_AccessSpecIDMessage,
 }
 
 
@@ -1621,7 +1659,7 @@ Message_struct['ENABLE_ACCESSSPEC'] = {
         'ID',
         'AccessSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'AccessSpecID'),
+    'encode': encode_AccessSpecIDMessage,
 }
 
 
@@ -1645,7 +1683,7 @@ Message_struct['DISABLE_ACCESSSPEC'] = {
         'ID',
         'AccessSpecID'
     ],
-    'encode': basic_param_encode_generator(uint_pack, 'AccessSpecID'),
+    'encode': encode_AccessSpecIDMessage,
 }
 
 
@@ -1683,11 +1721,9 @@ def encode_AccessCommand(par, param_info):
     # C1G2 OpSpec or a ClientRequestOpSpec or a custom parameter
     opSpecs = par['OpSpecParameter']
 
-    data = b''
-    for opName, spec_info in opSpecs:
-        data += encode_param(opName, spec_info)
+    data = [encode_param(opName, spec_info) for opName, spec_info in opSpecs]
 
-    return encode_all_parameters(par, param_info, data)
+    return encode_all_parameters(par, param_info, b''.join(data))
 
 
 Param_struct['AccessCommand'] = {
@@ -1948,7 +1984,7 @@ def decode_GPITriggerValue(data, name=None):
 
     par = {
         'GPIPortNum': gpi_port_num,
-        'GPIEvent': gpi_event & BIT(7) == BIT(7),
+        'GPIEvent': bool(gpi_event & 0x80),
         'Timeout': timeout,
     }
 
@@ -2006,13 +2042,14 @@ Param_struct['ROSpecStopTrigger'] = {
 
 # 16.2.4.2 AISpec Parameter (LLRP v1.1 section 17.2.4.2)
 def encode_AISpec(par, param_info):
-    # Antenna count
-    data = [ushort_pack(len(par['AntennaID']))]
-    # List of AntennaID
-    for antid in par['AntennaID']:
-        data.append(ushort_pack(int(antid)))
+    # Antenna count followed by the list of AntennaID, in a single pack
+    # (struct caches the compiled formats)
+    antenna_ids = [int(antid) for antid in par['AntennaID']]
+    antenna_count = len(antenna_ids)
+    packed = struct.pack('!H%dH' % antenna_count, antenna_count,
+                         *antenna_ids)
 
-    return encode_all_parameters(par, param_info, b''.join(data))
+    return encode_all_parameters(par, param_info, packed)
 
 
 def decode_AISPec(data, name=None):
@@ -2204,7 +2241,7 @@ def decode_GPOEvent(data, name=None):
     par = {}
 
     par['GPOPortNumber'], flags = ushort_ubyte_unpack(data)
-    par['GPOData'] = flags & BIT(7) == BIT(7)
+    par['GPOData'] = bool(flags & 0x80)
 
     return par, ''
 
@@ -2253,7 +2290,7 @@ def decode_AntennaProperties(data, name=None):
     (flags,
      par['AntennaID'],
      par['AntennaGain']) = ubyte_ushort_short_unpack(data)
-    par['AntennaConnected'] = flags & BIT(7) == BIT(7)
+    par['AntennaConnected'] = bool(flags & 0x80)
 
     return par, ''
 
@@ -2328,7 +2365,7 @@ def decode_GPIPortCurrentState(data, name=None):
     par = {}
 
     par['GPIPortNum'], flags, par['GPIState'] = ushort_ubyte_ubyte_unpack(data)
-    par['GPIConfig'] = flags & BIT(7) == BIT(7)
+    par['GPIConfig'] = bool(flags & 0x80)
 
     return par, ''
 
@@ -2350,7 +2387,7 @@ def decode_EventsAndReports(data, name=None):
 
     flags = ubyte_unpack(data)[0]
     par = {
-        'HoldEventsAndReportsUponReconnect': flags & BIT(7) == BIT(7)
+        'HoldEventsAndReportsUponReconnect': bool(flags & 0x80)
     }
 
     return par, ''
@@ -2367,7 +2404,7 @@ Param_struct['EventsAndReports'] = {
 
 # 16.3.1.2.1 C1G2InventoryCommand Parameter
 def encode_C1G2InventoryCommand(par, param_info):
-    packed = ubyte_pack((par['TagInventoryStateAware'] and 1 or 0) << 7)
+    packed = ubyte_pack(0x80 if par['TagInventoryStateAware'] else 0)
     return encode_all_parameters(par, param_info, packed)
 
 
@@ -2376,7 +2413,7 @@ def decode_C1G2InventoryCommand(data, name=None):
     par = {}
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
-    par['TagInventoryStateAware'] = (flags & BIT(7) == BIT(7))
+    par['TagInventoryStateAware'] = bool(flags & 0x80)
 
     par, _ = decode_all_parameters(data[ubyte_size:], 'C1G2InventoryCommand',
                                    par)
@@ -2583,15 +2620,15 @@ def encode_ReaderEventNotificationSpec(par, param_info):
 
     states = par['EventNotificationState']
 
-    data = b''
+    data = []
     for ev_type, flag in states.items():
         if ev_type not in EventState_Name2Value:
             logger.warning('Unknown event name %s', ev_type)
             continue
         eventstate_par = {'EventType': ev_type,
                           'NotificationState': flag}
-        data += encode_param('EventNotificationState', eventstate_par)
-    return data
+        data.append(encode_param('EventNotificationState', eventstate_par))
+    return b''.join(data)
 
 
 Param_struct['ReaderEventNotificationSpec'] = {
@@ -2618,7 +2655,7 @@ def decode_EventNotificationState(data, name=None):
     event_type, flags = ushort_ubyte_unpack(data)
     par = {
         'EventType': EventState_Value2Name[event_type],
-        'NotificationState': flags & BIT(7) == BIT(7)
+        'NotificationState': bool(flags & 0x80)
     }
 
     return par, ''
@@ -2638,13 +2675,9 @@ Param_struct['EventNotificationState'] = {
 # 16.2.7.1 TagReportContentSelector Parameter
 def encode_TagReportContentSelector(par, param_info):
     flags = 0
-    i = 15
-    for field in param_info['fields']:
-        if field in ['C1G2EPCMemorySelector', 'CustomParameter']:
-            continue
+    for field, mask in TagReportContentSelector_FieldMasks:
         if par.get(field, False):
-            flags = flags | (1 << i)
-        i = i - 1
+            flags |= mask
     packed = ushort_pack(flags)
     return encode_all_parameters(par, param_info, packed)
 
@@ -2654,12 +2687,8 @@ def decode_TagReportContentSelector(data, name=None):
     par = {}
 
     flags = ushort_unpack(data[:ushort_size])[0]
-    i = 15
-    for field in Param_struct['TagReportContentSelector']['fields']:
-        if field in ['C1G2EPCMemorySelector', 'CustomParameter']:
-            continue
-        par[field] = (flags & BIT(i) == BIT(i))
-        i = i - 1
+    for field, mask in TagReportContentSelector_FieldMasks:
+        par[field] = bool(flags & mask)
 
     data = data[ushort_size:]
     par, _ = decode_all_parameters(data, 'TagReportContentSelector', par)
@@ -2687,6 +2716,14 @@ Param_struct['TagReportContentSelector'] = {
     'decode': decode_TagReportContentSelector,
 }
 
+# (field, mask) of each TagReportContentSelector flag, from the MSB down.
+# The sub-parameters end up in the same fields list, they are not flags.
+TagReportContentSelector_FieldMasks = tuple(
+    (field, 0x8000 >> i) for i, field in enumerate(
+        [field for field in Param_struct['TagReportContentSelector']['fields']
+         if field not in Param_struct['TagReportContentSelector']['o_fields']
+         and field != 'CustomParameter']))
+
 
 # 15.2.1.5.1 C1G2EPCMemorySelector Parameter
 def encode_C1G2EPCMemorySelector(par, param_info):
@@ -2706,9 +2743,9 @@ def decode_C1G2EPCMemorySelector(data, name=None):
 
     flags = ubyte_unpack(data)[0]
     par = {
-        'EnableCRC': flags & BIT(7) == BIT(7),
-        'EnablePCBits': flags & BIT(6) == BIT(6),
-        'EnableXPCBits': flags & BIT(5) == BIT(5)
+        'EnableCRC': bool(flags & 0x80),
+        'EnablePCBits': bool(flags & 0x40),
+        'EnableXPCBits': bool(flags & 0x20)
     }
 
     return par, ''
@@ -2937,8 +2974,8 @@ Param_struct['EPC'] = {
 
 # 16.2.7.3.2 EPC-96 Parameter
 def decode_EPC96(data, name=None):
-    # (EPC-96 bits) (96 // 8) = 12 bytes
-    data = data[:12]
+    # data is already the 12 bytes, (96 // 8), of the EPC-96 value: the
+    # length of TV parameters comes from their type
     return hexlify(data), ''
 
 
@@ -2951,6 +2988,15 @@ Param_struct['EPC-96'] = {
 }
 
 
+def decode_C1G2SingulationDetails(data, name=None):
+    # Both 16-bit fields in a single 32-bit read
+    slots = uint_unpack(data)[0]
+    return {
+        'NumCollisionSlots': slots >> 16,
+        'NumEmptySlots': slots & 0xFFFF,
+    }, ''
+
+
 Param_struct['C1G2SingulationDetails'] = {
     'type': 18,
     'tv_encoded': True,
@@ -2961,9 +3007,7 @@ Param_struct['C1G2SingulationDetails'] = {
     'encode': basic_param_encode_generator(ushort_ushort_pack,
                                            'NumCollisionSlots',
                                            'NumEmptySlots'),
-    'decode': basic_param_decode_generator(ushort_ushort_unpack,
-                                           'NumCollisionSlots',
-                                           'NumEmptySlots')
+    'decode': decode_C1G2SingulationDetails
 }
 
 
@@ -2993,7 +3037,7 @@ def decode_GPIEvent(data, name=None):
     par = {}
 
     par['GPIPortNumber'], flags = ushort_ubyte_unpack(data)
-    par['GPIEvent'] = flags & BIT(7) == BIT(7)
+    par['GPIEvent'] = bool(flags & 0x80)
 
     return par, ''
 
@@ -4016,8 +4060,8 @@ def decode_ImpinjInventoryConfiguration(data, name=None):
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
     par = {
-        'EnableAntDwellTimeLimit': flags & BIT(7) == BIT(7),
-        'EnableSelectGapClose': flags & BIT(6) == BIT(6)
+        'EnableAntDwellTimeLimit': bool(flags & 0x80),
+        'EnableSelectGapClose': bool(flags & 0x40)
     }
 
     data = data[ubyte_size:]
@@ -4188,7 +4232,7 @@ def decode_ImpinjIntelligentAntennaManagement(data, name=None):
 
     flags = ubyte_unpack(data)[0]
     par = {
-        'ManagementEnabled': flags & BIT(7) == BIT(7)
+        'ManagementEnabled': bool(flags & 0x80)
     }
 
     return par, ''
@@ -4211,7 +4255,7 @@ def decode_ImpinjTIDParity(data, name=None):
 
     flags = ushort_unpack(data[:ushort_size])[0]
     par = {
-        'ParityError': flags & BIT(15) == BIT(15),
+        'ParityError': bool(flags & 0x8000),
     }
 
     return par, ''
@@ -4238,7 +4282,7 @@ def decode_ImpinjAntennaEventConfiguration(data, name=None):
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
     par = {
-        'EnableAntennaAttemptNotification': flags & BIT(7) == BIT(7)
+        'EnableAntennaAttemptNotification': bool(flags & 0x80)
     }
 
     data = data[ubyte_size:]
@@ -4304,7 +4348,7 @@ def decode_ImpinjRFPowerSweep(data, name=None):
     (flags,
      par['MinimumPowerLevel'],
      par['PowerLevelStepSize']) = ubyte_ushort_ushort_unpack(data)
-    par['EnableRFPowerSweep'] = flags & BIT(7) == BIT(7)
+    par['EnableRFPowerSweep'] = bool(flags & 0x80)
 
     return par, ''
 
@@ -4329,12 +4373,12 @@ def decode_MotoGeneralCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanGetGeneralParams': flags & BIT(7) == BIT(7),
-        'CanReportPartNumber': flags & BIT(6) == BIT(6),
-        'CanReportRadioVersion': flags & BIT(5) == BIT(5),
-        'CanSupportRadioPowerState': flags & BIT(4) == BIT(4),
-        'CanSupportRadioTransmitDelay': flags & BIT(3) == BIT(3),
-        'CanSupportZebraTrigger': flags & BIT(2) == BIT(2),
+        'CanGetGeneralParams': bool(flags & 0x80),
+        'CanReportPartNumber': bool(flags & 0x40),
+        'CanReportRadioVersion': bool(flags & 0x20),
+        'CanSupportRadioPowerState': bool(flags & 0x10),
+        'CanSupportRadioTransmitDelay': bool(flags & 0x08),
+        'CanSupportZebraTrigger': bool(flags & 0x04),
     }
 
     return par, ''
@@ -4362,7 +4406,7 @@ def decode_MotoAutonomousCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanSupportAutonomousMode': flags & BIT(7) == BIT(7)
+        'CanSupportAutonomousMode': bool(flags & 0x80)
     }
 
     return par, ''
@@ -4385,7 +4429,7 @@ def decode_MotoAutonomousState(data, name=None):
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
     par = {
-        'AutonomousModeState': flags & BIT(7) == BIT(7),
+        'AutonomousModeState': bool(flags & 0x80),
     }
 
     return par, ''
@@ -4408,7 +4452,7 @@ def decode_MotoDefaultSpec(data, name=None):
     flags = ubyte_unpack(data[:ubyte_size])[0]
 
     par = {
-        'UseDefaultSpecForAutoMode': flags & BIT(7) == BIT(7),
+        'UseDefaultSpecForAutoMode': bool(flags & 0x80),
     }
 
     par, _ = decode_all_parameters(data[ubyte_size:], 'MotoDefaultSpec', par)
@@ -4438,9 +4482,9 @@ def decode_MotoTagEventsGenerationCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanSelectTagEvents': flags & BIT(7) == BIT(7),
-        'CanSelectTagReportingFormat': flags & BIT(6) == BIT(6),
-        'CanSelectMovingEvent': flags & BIT(5) == BIT(5),
+        'CanSelectTagEvents': bool(flags & 0x80),
+        'CanSelectTagReportingFormat': bool(flags & 0x40),
+        'CanSelectMovingEvent': bool(flags & 0x20),
     }
 
     return par, ''
@@ -4575,9 +4619,9 @@ def decode_MotoFilterCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanFilterTagsBasedOnRSSI': flags & BIT(7) == BIT(7),
-        'CanFilterTagsBasedOnTimeOfDay': flags & BIT(6) == BIT(6),
-        'CanFilterTagsBasedOnUTCTimeStamp': flags & BIT(5) == BIT(5),
+        'CanFilterTagsBasedOnRSSI': bool(flags & 0x80),
+        'CanFilterTagsBasedOnTimeOfDay': bool(flags & 0x40),
+        'CanFilterTagsBasedOnUTCTimeStamp': bool(flags & 0x20),
     }
 
     return par, ''
@@ -4738,7 +4782,7 @@ def decode_MotoFilterList(data, name=None):
     use_filter = uint_unpack(data[:uint_size])[0]
 
     par = {
-        'UseFilter': use_filter & BIT(31) == BIT(31)
+        'UseFilter': bool(use_filter & 0x80000000)
     }
 
     par, _ = decode_all_parameters(data[uint_size:], 'MotoFilterList', par)
@@ -4792,9 +4836,9 @@ def decode_MotoPersistenceCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanSaveConfiguration': flags & BIT(7) == BIT(7),
-        'CanSaveTags': flags & BIT(6) == BIT(6),
-        'CanSaveEvents': flags & BIT(5) == BIT(5),
+        'CanSaveConfiguration': bool(flags & 0x80),
+        'CanSaveTags': bool(flags & 0x40),
+        'CanSaveEvents': bool(flags & 0x20),
     }
 
     return par, ''
@@ -4819,9 +4863,9 @@ def decode_MotoPersistenceSaveParams(data, name=None):
 
     flags = ubyte_unpack(data[:ubyte_size])[0]
     par = {
-        'SaveConfiguration': flags & BIT(7) == BIT(7),
-        'SaveTagData': flags & BIT(6) == BIT(6),
-        'SaveTagEventData': flags & BIT(5) == BIT(5),
+        'SaveConfiguration': bool(flags & 0x80),
+        'SaveTagData': bool(flags & 0x40),
+        'SaveTagEventData': bool(flags & 0x20),
     }
 
     return par, ''
@@ -4846,12 +4890,12 @@ def decode_MotoC1G2LLRPCapabilities(data, name=None):
     version, flags = uint_ubyte_unpack(data[:uint_ubyte_size])
     par = {
         'Version': version,
-        'CanSupportBlockPermalock': flags & BIT(7) == BIT(7),
-        'CanSupportRecommissioning': flags & BIT(6) == BIT(6),
-        'CanWriteUMI': flags & BIT(5) == BIT(5),
-        'CanSupportNXPCuxtomCommands': flags & BIT(4) == BIT(4),
-        'CanSupportFujitsuCuxtomCommands': flags & BIT(3) == BIT(3),
-        'CanSupportG2V2Commands': flags & BIT(2) == BIT(2),
+        'CanSupportBlockPermalock': bool(flags & 0x80),
+        'CanSupportRecommissioning': bool(flags & 0x40),
+        'CanWriteUMI': bool(flags & 0x20),
+        'CanSupportNXPCuxtomCommands': bool(flags & 0x10),
+        'CanSupportFujitsuCuxtomCommands': bool(flags & 0x08),
+        'CanSupportG2V2Commands': bool(flags & 0x04),
     }
 
     return par, ''
@@ -4880,7 +4924,7 @@ def decode_MotoCustomCommandOptions(data, name=None):
     flags = uint_unpack(data[:uint_size])[0]
 
     par = {
-        'EnableNXPSetAndResetQuietCommands': flags & BIT(31) == BIT(31),
+        'EnableNXPSetAndResetQuietCommands': bool(flags & 0x80000000),
     }
 
     return par, ''
@@ -5183,6 +5227,8 @@ class LLRPROSpec(dict):
 
 
 class LLRPMessageDict(dict):
+    __slots__ = ()
+
     def __repr__(self):
         return llrp_data2xml(self)
 
@@ -5238,3 +5284,54 @@ for source_struct, dest_dict, obj_name in [
 
         # Fill reverse dict
         dest_dict[(msgtype, vendorid, subtype)] = msgname
+
+# Direct dispatch from a message header to the message name and its decoder,
+# so that incoming messages are resolved with a single lookup
+Message_Type2Decoder = {}
+for msgkey, msgname in iteritems(Message_Type2Name):
+    decoder = Message_struct[msgname].get('decode')
+    if decoder is not None:
+        Message_Type2Decoder[msgkey] = (msgname, decoder)
+
+# Standard messages are only identified by their 10-bit type, index them in a
+# flat table. Custom messages need the dict lookup on the full key.
+# Like the other flat tables below, it is frozen as a tuple once filled.
+Message_StdType2Decoder = [None] * (TYPE_CUSTOM + 1)
+for msgkey, msgentry in iteritems(Message_Type2Decoder):
+    if msgkey[0] != TYPE_CUSTOM:
+        Message_StdType2Decoder[msgkey[0]] = msgentry
+Message_StdType2Decoder = tuple(Message_StdType2Decoder)
+
+# Same for outgoing messages: message name to its struct and its encoder
+Message_Name2Encoder = {}
+for msgname, msginfo in iteritems(Message_struct):
+    encoder = msginfo.get('encode')
+    if encoder is not None:
+        Message_Name2Encoder[msgname] = (msginfo, encoder)
+
+# Standard parameters are only identified by their 10-bit type too, index
+# their name and decoder (None if missing) in a flat table for decode_param.
+# Unknown types get (None, None).
+_UNKNOWN_PARAM_DECODER = (None, None)
+Param_StdType2Decoder = [_UNKNOWN_PARAM_DECODER] * (TYPE_CUSTOM + 1)
+# Custom parameters are indexed by vendor id and subtype packed in a single
+# int key: (vendorid << 32) | subtype
+Param_CustomKey2Decoder = {}
+for parkey, parname in iteritems(Param_Type2Name):
+    parentry = (parname, Param_struct[parname].get('decode'))
+    if parkey[0] != TYPE_CUSTOM:
+        Param_StdType2Decoder[parkey[0]] = parentry
+    else:
+        Param_CustomKey2Decoder[(parkey[1] << 32) | parkey[2]] = parentry
+Param_StdType2Decoder = tuple(Param_StdType2Decoder)
+
+# TV encoded parameters are identified by their 7-bit type only, index their
+# name, decoder and unpack_from function (None if the generic decoder was
+# overridden) in a flat table for decode_param
+TVE_Param_Type2Decoder = [None] * (TVE_PARAM_TYPE_MAX + 1)
+for p_type in TVE_PARAM_FORMATS:
+    p_name = Param_Type2Name[(p_type, 0, 0)]
+    p_struct = Param_struct[p_name]
+    TVE_Param_Type2Decoder[p_type] = (p_name, p_struct['decode'],
+                                      p_struct.get('tv_unpack_from'))
+TVE_Param_Type2Decoder = tuple(TVE_Param_Type2Decoder)
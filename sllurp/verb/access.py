@@ -7,7 +7,7 @@ import sys
 from sllurp.util import monotonic
 from sllurp.llrp import (LLRPReaderConfig, LLRPReaderClient, LLRPReaderState,
                          C1G2Read, C1G2Write)
-from sllurp.log import get_logger
+from sllurp.log import get_logger, is_general_debug_enabled
 
 start_time = None
 
@@ -66,7 +66,8 @@ def tag_report_cb(reader, tags):
                     sys.stdout.write(data)
                 else:
                     sys.stdout.buffer.write(data) # bytes
-                logger.debug("hex data: %s", binascii.hexlify(data))
+                if is_general_debug_enabled():
+                    logger.debugfast("hex data: %s", binascii.hexlify(data))
 
 
 def main(main_args):
@@ -2,9 +2,12 @@ from __future__ import unicode_literals
 import unittest
 import random
 import binascii
+import errno
 import logging
+import socket
 import struct
 import sys
+import threading
 
 import pytest
 import sllurp
@@ -68,6 +71,32 @@ class MockConn(object):
     def sendall(self, mybytes):
         pass
 
+    def send(self, mybytes):
+        return len(mybytes)
+
+
+class MockSocket(object):
+    """Non-blocking socket accepting at most max_send bytes per send"""
+
+    def __init__(self, max_send=4096):
+        self.max_send = max_send
+        self.blocked = False
+        self.sent = []
+        self.closed = False
+
+    def send(self, mybytes):
+        if self.blocked:
+            raise socket.error(errno.EAGAIN, 'Would block')
+        sent = mybytes[:self.max_send]
+        self.sent.append(sent)
+        return len(sent)
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        self.closed = True
+
 
 class FauxClient(object):
     def __init__(self):
@@ -96,6 +125,21 @@ class TestROSpec(unittest.TestCase):
             set(masks))
 
 
+class TestWantsMessage(unittest.TestCase):
+    def test_wants_message(self):
+        states = sllurp.llrp.LLRPReaderState
+        client = sllurp.llrp.LLRPClient(sllurp.llrp.LLRPReaderConfig())
+        self.assertTrue(client.wants_message('READER_EVENT_NOTIFICATION'))
+        self.assertTrue(client.wants_message('ADD_ROSPEC_RESPONSE'))
+        self.assertFalse(client.wants_message('KEEPALIVE'))
+
+        client.state = states.STATE_INVENTORYING
+        self.assertFalse(client.wants_message('READER_EVENT_NOTIFICATION'))
+        self.assertFalse(client.wants_message('RO_ACCESS_REPORT'))
+        client._deferreds['RO_ACCESS_REPORT'].append(lambda *args: None)
+        self.assertTrue(client.wants_message('RO_ACCESS_REPORT'))
+
+
 class TestReaderEventNotification(unittest.TestCase):
     def test_decode(self):
         data = binascii.unhexlify('043f000000200ab288c900f600160080000c0004f8'
@@ -209,6 +253,38 @@ class TestDecodeROAccessReport (unittest.TestCase):
         self._reader.raw_data_received(self._binr)
         self.assertEqual(self._tags_seen, 45)
 
+    def test_fragmented(self):
+        """Same pile of bytes, received in small chunks."""
+        self._reader.state = sllurp.llrp.LLRPReaderState.STATE_INVENTORYING
+        for i in range(0, len(self._binr), 100):
+            self._reader.raw_data_received(self._binr[i:i + 100])
+        self.assertEqual(self._tags_seen, 45)
+        self.assertEqual(self._reader.expected_bytes, 0)
+
+    def test_reused_buffer(self):
+        """Same, through views of a buffer overwritten by each read."""
+        self._reader.state = sllurp.llrp.LLRPReaderState.STATE_INVENTORYING
+        reports = []
+        self._reader.add_tag_report_callback(
+            lambda reader, tags: reports.append(tags))
+        rx_buffer = bytearray(700)
+        rx_view = memoryview(rx_buffer)
+        for i in range(0, len(self._binr), len(rx_buffer)):
+            chunk = self._binr[i:i + len(rx_buffer)]
+            rx_buffer[:len(chunk)] = chunk
+            self._reader.raw_data_received(rx_view[:len(chunk)])
+        self.assertEqual(self._tags_seen, 45)
+        self.assertEqual(self._reader.expected_bytes, 0)
+
+        # The reports do not refer to the overwritten buffer
+        rx_buffer[:] = bytearray(len(rx_buffer))
+        expected_reports = []
+        self._reader.add_tag_report_callback(
+            lambda reader, tags: expected_reports.append(tags))
+        self._reader.raw_data_received(self._binr)
+        self.assertEqual(len(expected_reports), 45)
+        self.assertEqual(reports[:45], expected_reports)
+
     def tearDown(self):
         pass
 
@@ -243,6 +319,21 @@ class TestEncodings(unittest.TestCase):
         flags = int(binascii.hexlify(data[4:]), 16) >> 6
         self.assertEqual(flags, 0b0001011110)
 
+    def test_tagreportcontentselector_flags(self):
+        # Only the flags get a bit, not the sub-parameters
+        field_masks = sllurp.llrp_proto.TagReportContentSelector_FieldMasks
+        self.assertEqual(field_masks, (
+            ('EnableROSpecID', 0x8000),
+            ('EnableSpecIndex', 0x4000),
+            ('EnableInventoryParameterSpecID', 0x2000),
+            ('EnableAntennaID', 0x1000),
+            ('EnableChannelIndex', 0x0800),
+            ('EnablePeakRSSI', 0x0400),
+            ('EnableFirstSeenTimestamp', 0x0200),
+            ('EnableLastSeenTimestamp', 0x0100),
+            ('EnableTagSeenCount', 0x0080),
+            ('EnableAccessSpecID', 0x0040)))
+
     def test_encode_bitstring(self):
         eb = sllurp.llrp_proto.encode_bitstring
         self.assertEqual(eb(b'\x41\x42\x43', 6), b'ABC\x00\x00\x00')
@@ -300,6 +391,12 @@ class TestMessageStruct(unittest.TestCase):
                                  "parameter type not unique in msg_struct")
                 param_types[msg_type] = True
 
+    def test_unknown_message_type(self):
+        # Version 1, type 500: no such standard message
+        msgbytes = struct.pack('!HII', (1 << 10) | 500, 10, 1)
+        with self.assertRaises(sllurp.llrp_errors.LLRPError):
+            sllurp.llrp.LLRPMessage.from_bytes(msgbytes)
+
 class TestGetReaderConfig(unittest.TestCase):
     def test_get_reader_config(self):
         msg_header_size = 10
@@ -399,6 +496,93 @@ class TestGetReaderConfig(unittest.TestCase):
                   'EventsAndReports']:
             self.assertIn(k, keys)
 
+
+class TestTxPower(unittest.TestCase):
+    def setUp(self):
+        self.client = sllurp.llrp.LLRPClient(sllurp.llrp.LLRPReaderConfig())
+        self.client.parseCapabilities({
+            'GeneralDeviceCapabilities': {
+                'MaxNumberOfAntennaSupported': 2,
+            },
+            'RegulatoryCapabilities': {
+                'UHFBandCapabilities': {
+                    'TransmitPowerLevelTableEntry': [
+                        {'Index': 1, 'TransmitPowerValue': 1000},
+                        {'Index': 2, 'TransmitPowerValue': 3000},
+                        {'Index': 3, 'TransmitPowerValue': 2000},
+                    ],
+                    'UHFC1G2RFModeTable': {
+                        'UHFC1G2RFModeTableEntry': [],
+                    },
+                },
+            },
+        })
+
+    def test_get_tx_power(self):
+        self.assertEqual(self.client.tx_power_table, [0, 10.0, 30.0, 20.0])
+        self.assertEqual(self.client.get_tx_power({1: 0, 2: 3}),
+                         {1: (2, 30.0), 2: (3, 20.0)})
+
+    def test_get_tx_power_invalid(self):
+        with self.assertRaises(sllurp.llrp_errors.LLRPError):
+            self.client.get_tx_power({1: 4})
+
+
+class TestSendData(unittest.TestCase):
+    def setUp(self):
+        config = sllurp.llrp.LLRPReaderConfig({'start_inventory': False})
+        self.reader = sllurp.llrp.LLRPReaderClient('localhost', config=config)
+        self.sock = MockSocket()
+        self.reader._socket = self.sock
+        # As if sent from the main loop: what can't be sent right away is
+        # left in the queue instead of being waited for
+        self.reader._socket_thread = threading.current_thread()
+
+    def tearDown(self):
+        self.reader._socket_thread = None
+
+    def send_pending(self):
+        with self.reader._tx_lock:
+            return self.reader._send_pending()
+
+    def test_short_write(self):
+        self.sock.max_send = 3
+        self.reader.send_data(b'abcdefgh')
+        self.assertEqual(self.sock.sent, [b'abc'])
+        self.assertEqual(list(self.reader._tx_queue), [b'defgh'])
+        # Queued data is coalesced and sent first
+        self.reader.send_data(b'ij')
+        self.assertEqual(self.sock.sent, [b'abc', b'def'])
+        self.assertEqual(list(self.reader._tx_queue), [b'ghij'])
+        self.sock.max_send = 4096
+        self.assertTrue(self.send_pending())
+        self.assertEqual(b''.join(self.sock.sent), b'abcdefghij')
+        self.assertEqual(len(self.reader._tx_queue), 0)
+
+    def test_would_block(self):
+        self.sock.blocked = True
+        self.reader.send_data(b'abc')
+        self.assertEqual(self.sock.sent, [])
+        self.assertEqual(list(self.reader._tx_queue), [b'abc'])
+        self.assertFalse(self.send_pending())
+        self.sock.blocked = False
+        self.assertTrue(self.send_pending())
+        self.assertEqual(self.sock.sent, [b'abc'])
+        self.assertEqual(len(self.reader._tx_queue), 0)
+
+    def test_send_after_disconnect(self):
+        self.sock.blocked = True
+        self.reader.send_data(b'abc')
+        self.reader.hard_disconnect()
+        self.assertTrue(self.sock.closed)
+        self.assertEqual(len(self.reader._tx_queue), 0)
+        with self.assertRaises(sllurp.llrp_errors.ReaderConfigurationError):
+            self.reader.send_data(b'def')
+        with self.assertRaises(sllurp.llrp_errors.ReaderConfigurationError):
+            self.send_pending()
+        self.assertEqual(len(self.reader._tx_queue), 0)
+
+
 class TestMisc(unittest.TestCase):
     def test_llrp_data2xml(self):
         assert sllurp.llrp_proto.llrp_data2xml(